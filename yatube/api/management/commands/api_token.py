@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import ApiToken
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Выдаёт пользователю новый ключ API для заголовка '
+            'Authorization: Token <ключ>; прежний ключ отзывается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.')
+        self.stdout.write(ApiToken.issue(user))
@@ -0,0 +1,50 @@
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.db import models
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ApiToken(models.Model):
+    """Ключ API пользователя для интеграций.
+
+    В базе лежит только хэш ключа: сам ключ показывается один раз,
+    когда выдаётся командой api_token.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='api_token',
+        verbose_name='Пользователь'
+    )
+    digest = models.CharField(max_length=64, unique=True, editable=False)
+    created = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата выдачи'
+    )
+
+    class Meta:
+        verbose_name = 'Ключ API'
+        verbose_name_plural = 'Ключи API'
+
+    def __str__(self):
+        return str(self.user)
+
+    @classmethod
+    def issue(cls, user):
+        """Новый ключ пользователя; прежний перестаёт действовать."""
+        key = secrets.token_urlsafe(32)
+        cls.objects.update_or_create(user=user,
+                                     defaults={'digest': _digest(key)})
+        return key
+
+    @classmethod
+    def user_for(cls, key):
+        """Активный владелец ключа или None."""
+        token = cls.objects.select_related('user').filter(
+            digest=_digest(key), user__is_active=True).first()
+        return token.user if token else None
@@ -0,0 +1,90 @@
+"""Словари для JSON прямо из строк .values(), без создания моделей.
+
+Поле ответа описывается путём для .values() и, если нужно,
+преобразованием значения. Клиент выбирает поля параметром
+?fields=id,author; без него отдаются поля по умолчанию.
+"""
+from django.core.files.storage import default_storage
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def _image_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Serializer:
+
+    def __init__(self, fields, default, converters=None):
+        self.fields = fields
+        self.default = default
+        self.converters = converters or {}
+
+    def select(self, requested=None):
+        """Поля ответа из строки ?fields= или поля по умолчанию."""
+        if not requested:
+            return tuple(self.default)
+        names = tuple(dict.fromkeys(
+            name.strip() for name in requested.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise InvalidFields(
+                'Неизвестные поля: {}. Доступны: {}.'.format(
+                    ', '.join(unknown) or '—', ', '.join(self.fields)))
+        return names
+
+    def lookups(self, names, extra=(), prefix=''):
+        """Пути для .values(): выбранные поля и нужные пагинации.
+
+        prefix — путь к полям из другой модели, например 'post__'.
+        """
+        return tuple(dict.fromkeys(
+            [prefix + self.fields[name] for name in names] + list(extra)))
+
+    def dump(self, row, names):
+        data = {}
+        for name in names:
+            value = row[self.fields[name]]
+            convert = self.converters.get(name)
+            data[name] = convert(value) if convert else value
+        return data
+
+    def dump_many(self, rows, names):
+        return [self.dump(row, names) for row in rows]
+
+
+posts = Serializer(
+    fields={
+        'id': 'id',
+        'text': 'text',
+        'preview': 'preview',
+        'pub_date': 'pub_date',
+        'updated': 'updated',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    },
+    # В лентах вместо полного текста — его начало, как в карточках.
+    default=('id', 'preview', 'pub_date', 'author', 'group', 'image',
+             'comments_count'),
+    converters={'image': _image_url},
+)
+post_detail = Serializer(
+    fields=posts.fields,
+    default=('id', 'text', 'pub_date', 'updated', 'author', 'group',
+             'image', 'comments_count'),
+    converters=posts.converters,
+)
+comments = Serializer(
+    fields={
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    default=('id', 'author', 'text', 'created'),
+)
@@ -0,0 +1,239 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.models import ApiToken
+from posts import search
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='test_group')
+        Post.objects.bulk_create(
+            [Post(author=cls.user, group=cls.group, text=f'post number {i}',
+                  preview=f'post number {i}')
+             for i in range(15)])
+        cls.post = Post.objects.create(author=cls.user, text='fresh post')
+        for i in range(3):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'comment number {i}')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def walk(self, url, **params):
+        """Все строки ленты по ссылкам next."""
+        response = self.client.get(url, params)
+        rows = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            rows += data['results']
+            if data['next'] is None:
+                return rows
+            response = self.client.get(data['next'])
+
+    def test_feeds_walk_by_cursor(self):
+        """Проверяет, что курсор проходит каждую ленту без пропусков."""
+        self.client.force_login(ApiTest.reader)
+        posts = Post.objects.order_by('-pub_date', '-id')
+        feeds = {
+            reverse('api:index'): posts,
+            reverse('api:group_posts', args=('test_group',)):
+                posts.filter(group=ApiTest.group),
+            reverse('api:profile', args=('FatWhiteFamily',)):
+                posts.filter(author=ApiTest.user),
+            reverse('api:follow_index'): posts.filter(author=ApiTest.user),
+        }
+        for url, expected in feeds.items():
+            with self.subTest(url=url):
+                rows = self.walk(url, limit=4)
+                self.assertEqual([row['id'] for row in rows],
+                                 list(expected.values_list('id', flat=True)))
+                self.assertEqual(rows[0]['author'], 'FatWhiteFamily')
+                self.assertNotIn('text', rows[0])
+        # Автор сверх лимита раскладки читается из Post, а не из лент.
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            rows = self.walk(reverse('api:follow_index'), limit=4)
+        self.assertEqual([row['id'] for row in rows], list(
+            feeds[reverse('api:follow_index')].values_list('id', flat=True)))
+
+    def test_sparse_fields(self):
+        """Проверяет, что ?fields= отдаёт только выбранные поля."""
+        response = self.client.get(reverse('api:index'),
+                                   {'fields': 'id,text'})
+        for row in response.json()['results']:
+            self.assertEqual(set(row), {'id', 'text'})
+        response = self.client.get(reverse('api:index'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_is_one_query_without_models(self):
+        """Проверяет, что страница ленты — один запрос."""
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:index'), {'limit': 100})
+
+    def test_etag_returns_not_modified(self):
+        """Проверяет, что совпавший ETag даёт 304 и новый пост его меняет."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Post.objects.create(author=ApiTest.user, text='newest post')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_post_and_comments(self):
+        """Проверяет пост и его комментарии."""
+        post_id = ApiTest.post.pk
+        data = self.client.get(reverse('api:post_detail',
+                                       args=(post_id,))).json()
+        self.assertEqual(data['text'], 'fresh post')
+        self.assertEqual(data['comments_count'], 3)
+        rows = self.walk(reverse('api:post_comments', args=(post_id,)),
+                         limit=2)
+        self.assertEqual([row['text'] for row in rows],
+                         [f'comment number {i}' for i in range(3)])
+        response = self.client.get(reverse('api:post_detail',
+                                           args=(post_id,)))
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(
+                reverse('api:post_detail', args=(post_id,)),
+                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_errors(self):
+        """Проверяет ответы об ошибках в JSON."""
+        cases = {
+            reverse('api:post_detail', args=(0,)): 404,
+            reverse('api:post_comments', args=(0,)): 404,
+            reverse('api:group_posts', args=('missing',)): 404,
+            reverse('api:follow_index'): 401,
+            reverse('api:index') + '?cursor=broken': 400,
+            reverse('api:index') + '?limit=1000': 400,
+        }
+        for url, status in cases.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+
+
+class BatchApiTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='test_group')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.client.force_login(BatchApiTest.user)
+
+    def send(self, name, items):
+        return self.client.post(reverse(f'api:{name}'),
+                                json.dumps({'items': items}),
+                                content_type='application/json')
+
+    def post_batch(self, count, prefix='batch post'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.send('posts_batch', [
+                {'text': f'{prefix} {i}', 'group': BatchApiTest.group.pk}
+                for i in range(count)])
+        self.assertEqual(response.status_code, 201)
+        return response.json()['ids'], len(queries)
+
+    def test_posts_batch_runs_side_effects_once(self):
+        """Проверяет пачку постов: ленты, счётчики, поиск и их цену."""
+        ids, small = self.post_batch(3, 'кошки')
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=ids).order_by('pk').values_list(
+                'text', 'preview', 'group')),
+            [(f'кошки {i}', f'кошки {i}', BatchApiTest.group.pk)
+             for i in range(3)])
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=BatchApiTest.reader).values_list('post', flat=True)),
+            set(ids))
+        user = User.objects.select_related('counters').get(
+            pk=BatchApiTest.user.pk)
+        self.assertEqual(user.counters.posts_count, 3)
+        self.assertEqual(set(search.SearchResults('кошки')[:10]),
+                         set(Post.objects.filter(pk__in=ids)))
+        _, large = self.post_batch(30)
+        self.assertEqual(large, small)
+
+    def test_comments_batch(self):
+        """Проверяет пачку комментариев и счётчики комментариев."""
+        ids, _ = self.post_batch(2)
+        response = self.send('comments_batch', [
+            {'post': ids[0], 'text': 'first'},
+            {'post': ids[0], 'text': 'second'},
+            {'post': ids[1], 'text': 'third'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['ids']), 3)
+        self.assertEqual(
+            dict(Post.objects.filter(pk__in=ids).values_list(
+                'pk', 'comments_count')),
+            {ids[0]: 2, ids[1]: 1})
+
+    def test_invalid_item_rejects_whole_batch(self):
+        """Проверяет, что ошибка в одном элементе отменяет всю пачку."""
+        cases = {
+            'posts_batch': [{'text': 'good'}, {'text': ''},
+                            {'text': 'x', 'group': 0}],
+            'comments_batch': [{'post': 0, 'text': 'lost'}, 'junk'],
+        }
+        for name, items in cases.items():
+            with self.subTest(name=name):
+                response = self.send(name, items)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(set(response.json()['errors']),
+                                 {str(i) for i in range(1, len(items))}
+                                 if name == 'posts_batch' else {'0', '1'})
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_requires_login_and_items(self):
+        self.assertEqual(self.send('posts_batch', []).status_code, 400)
+        self.client.logout()
+        self.assertEqual(
+            self.send('posts_batch', [{'text': 'post'}]).status_code, 401)
+
+    def test_token_auth_without_csrf(self):
+        """Проверяет вход по ключу API: без сессии и без CSRF-токена."""
+        client = Client(enforce_csrf_checks=True)
+        url = reverse('api:posts_batch')
+        body = json.dumps({'items': [{'text': 'из интеграции'}]})
+        key = ApiToken.issue(BatchApiTest.user)
+        response = client.post(url, body, content_type='application/json',
+                               HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Post.objects.get().author, BatchApiTest.user)
+        for header in (f'Token {key}x', f'Bearer {key}', 'Token '):
+            with self.subTest(header=header):
+                response = client.post(url, body,
+                                       content_type='application/json',
+                                       HTTP_AUTHORIZATION=header)
+                self.assertEqual(response.status_code, 401)
+        ApiToken.issue(BatchApiTest.user)
+        self.assertEqual(client.post(
+            url, body, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {key}').status_code, 401)
+        client.force_login(BatchApiTest.user)
+        response = client.post(url, body, content_type='application/json')
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertEqual(Post.objects.count(), 1)
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/posts/', views.index, name='index'),
+    path('v1/groups/<slug:slug>/posts/', views.group_posts,
+         name='group_posts'),
+    path('v1/users/<str:username>/posts/', views.profile, name='profile'),
+    path('v1/follow/posts/', views.follow_index, name='follow_index'),
+    path('v1/posts/batch/', views.posts_batch, name='posts_batch'),
+    path('v1/posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('v1/posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
+    path('v1/comments/batch/', views.comments_batch,
+         name='comments_batch'),
+]
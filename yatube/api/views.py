@@ -0,0 +1,217 @@
+"""JSON API: ленты, пост и его комментарии, запись пачками.
+
+Строки берутся через .values() теми же выборками, что и в posts.views,
+листаются курсором по ключу сортировки (?cursor=, ?limit=), а поля
+выбираются параметром ?fields=. ETag страницы ленты — хеш тела ответа,
+у поста и комментариев — тот же, что у страницы поста, поэтому
+условный GET к ним отвечает 304 одним запросом.
+
+Запись пачкой (posts.bulk) принимает {"items": [...]} от вошедшего
+пользователя и сохраняет либо всю пачку, либо ничего. Интеграции
+входят заголовком Authorization: Token <ключ> (см. ApiToken) без
+сессии и CSRF-токена; с сессией браузера CSRF проверяется как обычно.
+"""
+import hashlib
+import json
+from functools import partial, wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import (condition, require_POST,
+                                          require_safe)
+
+from core.db import read_replica
+from posts import bulk, timeline
+from posts.caching import post_etag, post_last_modified
+from posts.models import Comment, Group, Post, User
+from posts.paginator import CursorPaginator, InvalidCursor
+
+from . import serializers
+from .models import ApiToken
+
+
+def _error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def _limit(request, default):
+    value = request.GET.get('limit')
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+        raise ValueError(
+            f'limit — число от 1 до {settings.API_MAX_PAGE_SIZE}.')
+    return limit
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.dict()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{urlencode(query)}')
+
+
+def _page(request, queryset, serializer, ordering, per_page, pages=None):
+    """Ответ со страницей строк queryset или с ошибкой 400.
+
+    pages(paginate) вместо queryset отдаёт страницу сам, как
+    timeline.feed_page.
+    """
+    try:
+        names = serializer.select(request.GET.get('fields'))
+        limit = _limit(request, per_page)
+
+        def paginate(rows, prefix=''):
+            rows = rows.values(*serializer.lookups(
+                names, [name.lstrip('-') for name in ordering], prefix))
+            return CursorPaginator(rows, limit, ordering).page(
+                request.GET.get('cursor'))
+
+        page = pages(paginate) if pages else paginate(queryset)
+    except InvalidCursor:
+        return _error(400, 'Неверный cursor.')
+    except ValueError as error:
+        return _error(400, str(error))
+    return JsonResponse({
+        'results': serializer.dump_many(page, names),
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def _feed(request, posts, pages=None):
+    response = _page(request, posts, serializers.posts,
+                     ('-pub_date', '-id'), settings.NUM_OF_POSTS, pages)
+    if response.status_code != 200:
+        return response
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Cookie',))
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+@require_safe
+@read_replica
+def index(request):
+    return _feed(request, Post.objects.all())
+
+
+@require_safe
+@read_replica
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return _error(404, 'Группа не найдена.')
+    return _feed(request, Post.objects.filter(group_id=group_id))
+
+
+@require_safe
+@read_replica
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return _error(404, 'Пользователь не найден.')
+    return _feed(request, Post.objects.filter(author_id=author_id))
+
+
+@require_safe
+@read_replica
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error(401, 'Нужно войти.')
+    return _feed(request, None, pages=partial(
+        timeline.feed_page, request.user))
+
+
+@require_safe
+@read_replica
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+def post_detail(request, post_id):
+    serializer = serializers.post_detail
+    try:
+        names = serializer.select(request.GET.get('fields'))
+    except ValueError as error:
+        return _error(400, str(error))
+    row = Post.objects.filter(pk=post_id).values(
+        *serializer.lookups(names)).first()
+    if row is None:
+        return _error(404, 'Пост не найден.')
+    return JsonResponse(serializer.dump(row, names),
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@require_safe
+@read_replica
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+def post_comments(request, post_id):
+    # Запрос свежести поста уже сделан condition и запомнен в request.
+    if post_etag(request, post_id) is None:
+        return _error(404, 'Пост не найден.')
+    return _page(request, Comment.objects.filter(post_id=post_id),
+                 serializers.comments, ('created', 'id'),
+                 settings.COMMENTS_PER_PAGE)
+
+
+def token_auth(view):
+    """Вход по ключу API из заголовка Authorization: Token <ключ>.
+
+    Браузер сам такой заголовок не подставит, поэтому с ключом CSRF не
+    проверяется; без заголовка остаются сессия и проверка CSRF.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        header = request.META.get('HTTP_AUTHORIZATION')
+        if header is None:
+            return protected(request, *args, **kwargs)
+        scheme, _, key = header.partition(' ')
+        user = ApiToken.user_for(key) if scheme == 'Token' and key else None
+        if user is None:
+            return _error(401, 'Неверный ключ API.')
+        request.user = user
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _batch(request, create):
+    if not request.user.is_authenticated:
+        return _error(401, 'Нужно войти.')
+    try:
+        items = json.loads(request.body)['items']
+    except (ValueError, KeyError, TypeError):
+        return _error(400, 'Ожидается JSON вида {"items": [...]}.')
+    if not isinstance(items, list) or not items:
+        return _error(400, 'items — непустой список.')
+    if len(items) > settings.API_MAX_BATCH_SIZE:
+        return _error(
+            400, f'Не больше {settings.API_MAX_BATCH_SIZE} элементов.')
+    objects, errors = create(request.user, items)
+    if errors:
+        return JsonResponse({'errors': errors}, status=400,
+                            json_dumps_params={'ensure_ascii': False})
+    return JsonResponse({'ids': [obj.pk for obj in objects]}, status=201)
+
+
+@require_POST
+@token_auth
+def posts_batch(request):
+    return _batch(request, bulk.create_posts)
+
+
+@require_POST
+@token_auth
+def comments_batch(request):
+    return _batch(request, bulk.create_comments)
@@ -0,0 +1,61 @@
+"""Синхронный код из асинхронных view на ограниченном пуле потоков.
+
+Django 3.2 выполняет весь синхронный код с thread_sensitive=True в
+одном общем потоке, поэтому под ASGI синхронные view идут строго по
+очереди. run() отдаёт код в пул из ASYNC_DB_THREADS потоков: столько
+запросов работают с базой одновременно, остальные ждут своей очереди,
+не занимая цикл событий. Контекст запроса (core.db, core.hooks)
+копируется в поток пула. При ASYNC_DB_THREADS = 0 код идёт в общий
+поток Django: так в тестах, где данные теста видны только соединению
+основного потока.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_THREADS,
+                thread_name_prefix='asyncdb')
+        return _executor
+
+
+def _call(func, args, kwargs):
+    # Соединения потока пула живут по CONN_MAX_AGE, как между запросами
+    # WSGI: сигналов начала и конца запроса в этом потоке нет.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run(func, *args, **kwargs):
+    """Выполняет синхронную func в пуле и ждёт результат."""
+    if not settings.ASYNC_DB_THREADS:
+        return await sync_to_async(func, thread_sensitive=True)(
+            *args, **kwargs)
+    call = functools.partial(
+        contextvars.copy_context().run, _call, func, args, kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_pool(), call)
+
+
+def async_view(view):
+    """Асинхронная версия view: он целиком, с декораторами, идёт в run()."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run(view, request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,284 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+В отличие от LocMemCache записи видят все воркеры gunicorn, а внешний
+сервер не нужен. Объём ограничен OPTIONS['MAX_BYTES']: при переполнении
+сначала удаляются просроченные записи, затем давно не читанные (LRU).
+MAX_BYTES = None снимает ограничение: записи не вытесняются.
+
+Просроченная запись ещё OPTIONS['STALE_TIMEOUT'] секунд хранится как
+устаревшая: первый читатель получает промах и пересчитывает значение,
+а остальные до его set() получают старое значение, а не идут в базу
+все разом.
+
+MeteredCache — обёртка над любым бэкендом, которая считает попадания и
+промахи в замер запроса core.metrics.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    refresh_until REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_size (total INTEGER NOT NULL);
+INSERT INTO cache_size SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM cache_size);
+CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache
+BEGIN UPDATE cache_size SET total = total + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache
+BEGIN UPDATE cache_size SET total = total - OLD.size; END;
+CREATE TRIGGER IF NOT EXISTS cache_size_update AFTER UPDATE OF size ON cache
+BEGIN UPDATE cache_size SET total = total - OLD.size + NEW.size; END;
+'''
+
+
+class _ThreadState(threading.local):
+    """Соединения и счётчики потока по пути к файлу кэша.
+
+    Django создаёт объект кэша в каждом потоке, а под ASGI — и в каждом
+    копировании контекста (core.asyncdb), так что держать соединение в
+    объекте значило бы открывать файл заново на каждый вызов.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.connections = {}
+        self.stats = {}
+
+
+_thread = _ThreadState()
+
+
+class SQLiteCache(BaseCache):
+    """Кэш-бэкенд Django поверх одного файла SQLite в режиме WAL."""
+
+    UPSERT = (
+        'INSERT INTO cache (key, value, size, expires, accessed) '
+        'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+        'value = excluded.value, size = excluded.size, '
+        'expires = excluded.expires, accessed = excluded.accessed, '
+        'refresh_until = 0'
+    )
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        max_bytes = options.get('MAX_BYTES', 64 * 1024 * 1024)
+        self._max_bytes = None if max_bytes is None else int(max_bytes)
+        self._stale_timeout = float(options.get('STALE_TIMEOUT', 30))
+        self._lock_timeout = float(options.get('LOCK_TIMEOUT', 10))
+        # Время чтения записывается не чаще раза в столько секунд,
+        # иначе каждое чтение стало бы записью в файл.
+        self._lru_resolution = float(options.get('LRU_RESOLUTION', 5))
+
+    @property
+    def _db(self):
+        # После fork() соединения родителя использовать нельзя.
+        if _thread.pid != os.getpid():
+            _thread.pid = os.getpid()
+            _thread.connections = {}
+        connection = _thread.connections.get(self._path)
+        if connection is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=30,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            _thread.connections[self._path] = connection
+        return connection
+
+    @property
+    def stats(self):
+        """Попадания, промахи и устаревшие чтения этого потока."""
+        return _thread.stats.setdefault(self._path, Counter())
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        row = self._db.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            if expires + self._stale_timeout <= now:
+                self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+                self.stats['misses'] += 1
+                return default
+            claimed = self._db.execute(
+                'UPDATE cache SET refresh_until = ? '
+                'WHERE key = ? AND refresh_until <= ?',
+                (now + self._lock_timeout, key, now)
+            ).rowcount
+            if claimed:
+                self.stats['misses'] += 1
+                return default
+            self.stats['stale'] += 1
+        elif now - accessed > self._lru_resolution:
+            self._db.execute('UPDATE cache SET accessed = ? WHERE key = ?',
+                             (now, key))
+        self.stats['hits'] += 1
+        return pickle.loads(value)
+
+    def _write(self, sql, key, value, timeout, params=()):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        written = self._db.execute(
+            sql,
+            (key, data, len(data), self._expires(timeout), time.time())
+            + params
+        ).rowcount
+        self._cull()
+        return bool(written)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(self.UPSERT, self._key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._write(
+            self.UPSERT + ' WHERE cache.expires IS NOT NULL '
+            'AND cache.expires <= ?',
+            self._key(key, version), value, timeout, (time.time(),)
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return bool(self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), self._key(key, version), time.time())
+        ).rowcount)
+
+    def delete(self, key, version=None):
+        return bool(self._db.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        ).rowcount)
+
+    def has_key(self, key, version=None):
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute('UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                       (data, len(data), key))
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return value
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт столько же, сколько поток, и закрывается
+        # вместе с ним: открывать файл заново на каждый запрос дороже.
+        pass
+
+    def _cull(self):
+        if self._max_bytes is None:
+            return
+        db = self._db
+        total, = db.execute('SELECT total FROM cache_size').fetchone()
+        if total <= self._max_bytes:
+            return
+        now = time.time()
+        db.execute('DELETE FROM cache WHERE expires IS NOT NULL '
+                   'AND expires + ? <= ?', (self._stale_timeout, now))
+        total, = db.execute('SELECT total FROM cache_size').fetchone()
+        excess = total - self._max_bytes * 0.9
+        victims = []
+        for key, size in db.execute(
+                'SELECT key, size FROM cache ORDER BY accessed'):
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        db.executemany('DELETE FROM cache WHERE key = ?', victims)
+
+
+_missing = object()
+
+
+class MeteredCache:
+    """Кэш OPTIONS['BACKEND'], попадания в который видны в core.metrics.
+
+    Остальные параметры алиаса (LOCATION, TIMEOUT, OPTIONS) получает
+    обёрнутый бэкенд. get и get_many засчитываются в замер запроса,
+    остальные методы уходят в обёрнутый кэш как есть.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        backend = import_string(options.pop('BACKEND'))
+        self._cache = backend(location, dict(params, OPTIONS=options))
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _missing, version)
+        if value is _missing:
+            metrics.count_cache(0, 1)
+            return default
+        metrics.count_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._cache.get_many(keys, version)
+        metrics.count_cache(len(found), len(keys) - len(found))
+        return found
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT,
+                   version=None):
+        value = self.get(key, _missing, version)
+        if value is _missing:
+            value = self._cache.get_or_set(key, default, timeout, version)
+        return value
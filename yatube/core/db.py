@@ -0,0 +1,84 @@
+"""Чтение с реплик для страниц, помеченных read_replica.
+
+Запросы на чтение внутри такой страницы уходят на реплику из
+DATABASE_REPLICAS, выбранную случайно на весь запрос (так страница
+видит один снимок данных), всё остальное — на основную базу. Если запрос
+что-то записал (роутер видит db_for_write), ответ ставит cookie на
+REPLICA_STICKY_SECONDS: пока она жива, браузер читает с основной базы
+и автор сразу видит свой пост, даже если реплики ещё отстают.
+Сессии всегда читаются с основной базы: иначе после входа пользователь
+мог бы оказаться разлогинен до синхронизации реплики.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PIN_COOKIE = 'db_pin'
+
+_state = ContextVar('core_db_state', default=None)
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica = False
+        self.wrote = False
+        self.alias = None
+
+
+def begin(pinned=False):
+    """Начинает запрос; возвращает его состояние и токен для end()."""
+    state = RequestState(pinned)
+    return state, _state.set(state)
+
+
+def end(token):
+    _state.reset(token)
+
+
+def read_replica(view):
+    """Разрешает view читать с реплики."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        state.replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica = False
+    return wrapper
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is None or not state.replica or state.pinned
+                or state.wrote or not settings.DATABASE_REPLICAS
+                or model._meta.app_label == 'sessions'):
+            return None
+        if state.alias is None:
+            state.alias = random.choice(settings.DATABASE_REPLICAS)
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с данными основной базы.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
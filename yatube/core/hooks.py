@@ -0,0 +1,41 @@
+"""Обёртки вокруг SQL на время запроса, видимые из любого потока.
+
+connection.execute_wrapper действует только на соединение своего
+потока, а под ASGI SQL одного запроса выполняют разные потоки: код
+Django с thread_sensitive и пул core.asyncdb. Поэтому к каждому
+соединению при открытии подключается один диспетчер, который передаёт
+SQL обёрткам из contextvar. asgiref копирует контекст запроса в поток,
+где выполняется его синхронный код, так что обёртки видят весь SQL
+запроса и только его.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_wrappers = ContextVar('core_execute_wrappers', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    wrappers = _wrappers.get()
+    if not wrappers:
+        return execute(sql, params, many, context)
+    # Первая обёртка внешняя, как у вложенных connection.execute_wrapper.
+    for wrapper in reversed(wrappers):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install(sender, connection, **kwargs):
+    """Приёмник connection_created: диспетчер на соединение один раз."""
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """Как connection.execute_wrapper, но для всех потоков запроса."""
+    token = _wrappers.set(_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _wrappers.reset(token)
@@ -0,0 +1,156 @@
+"""Нагрузка на локальный сервер: много одновременных GET по кругу.
+
+Клиент — asyncio на голых сокетах с keep-alive, чтобы в одном процессе
+держать сотни соединений и не стать узким местом раньше Django. Для
+сравнения WSGI и ASGI serve() поднимает gunicorn (gthread) или uvicorn
+с одинаковым числом процессов и потоков для работы с базой.
+"""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+READY_TIMEOUT = 30
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(port, process):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise LoadTestError(
+                f'Сервер завершился с кодом {process.returncode}.')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise LoadTestError(f'Сервер не ответил за {READY_TIMEOUT} с.')
+
+
+def server_command(kind, port, workers, threads):
+    if kind == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'yatube.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+            '--worker-class', 'gthread', '--threads', str(threads),
+            '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'yatube.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--log-level', 'warning',
+        '--no-access-log',
+    ]
+
+
+@contextmanager
+def serve(kind, workers, threads):
+    """Запускает сервер kind ('wsgi' или 'asgi') и отдаёт его адрес."""
+    port = _free_port()
+    env = dict(os.environ, YATUBE_ASYNC_DB_THREADS=str(threads))
+    process = subprocess.Popen(server_command(kind, port, workers, threads),
+                               cwd=settings.BASE_DIR, env=env)
+    try:
+        _wait_ready(port, process)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = dict(
+        line.lower().split(': ', 1) for line in lines[1:] if ': ' in line)
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection') == 'close'
+
+
+async def _client(host, port, paths, offset, deadline, latencies, errors):
+    reader = writer = None
+    number = offset
+    while time.monotonic() < deadline:
+        path = paths[number % len(paths)]
+        number += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(
+                f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+            status, close = await _read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors.append('connection')
+            close = True
+        else:
+            if status >= 400:
+                errors.append(status)
+            else:
+                latencies.append(time.perf_counter() - started)
+        if close and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _load(url, paths, concurrency, duration):
+    host, port = url.split('://', 1)[1].split(':')
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        _client(host, int(port), paths, number, deadline, latencies, errors)
+        for number in range(concurrency)))
+    return latencies, errors
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run(url, paths, concurrency=200, duration=10):
+    """Гоняет GET по paths с concurrency соединений duration секунд."""
+    started = time.monotonic()
+    latencies, errors = asyncio.run(
+        _load(url, paths, concurrency, duration))
+    elapsed = time.monotonic() - started
+    if not latencies:
+        raise LoadTestError(f'{url}: ни одного успешного ответа, '
+                            f'ошибки: {sorted(set(map(str, errors)))}.')
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+    }
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core import loadtest
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность WSGI (gunicorn) и ASGI '
+            '(uvicorn) на читающих страницах posts при высокой '
+            'конкурентности.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Секунд нагрузки на каждый сервер.')
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Процессов сервера.')
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Потоков gunicorn и ASYNC_DB_THREADS uvicorn на процесс.')
+        parser.add_argument('--servers', nargs='+', default=['wsgi', 'asgi'],
+                            choices=['wsgi', 'asgi'])
+        parser.add_argument(
+            '--url', help='Нагрузить уже запущенный сервер, без --servers.')
+        parser.add_argument(
+            '--paths', nargs='+', metavar='PATH',
+            help='Адреса страниц; по умолчанию ленты, пост и глубокая '
+                 'страница главной.')
+
+    def default_paths(self):
+        _, pages = benchmark.scenarios()
+        paths = [url for method, url, _, login in pages.values()
+                 if method == 'get' and not login]
+        return paths + [reverse('posts:index') + '?page=500']
+
+    def report(self, name, metrics):
+        self.stdout.write(
+            f'{name:<6} {metrics["rps"]:>8.1f} запр./с  '
+            f'p50 {metrics["p50_ms"]:>8.1f} мс  '
+            f'p95 {metrics["p95_ms"]:>8.1f} мс  '
+            f'p99 {metrics["p99_ms"]:>8.1f} мс  '
+            f'ответов {metrics["requests"]:>6}  '
+            f'ошибок {metrics["errors"]:>5}'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            paths = options['paths'] or self.default_paths()
+            load = dict(paths=paths, concurrency=options['concurrency'],
+                        duration=options['duration'])
+            if options['url']:
+                self.report('url', loadtest.run(options['url'], **load))
+                return
+            for kind in options['servers']:
+                with loadtest.serve(kind, options['workers'],
+                                    options['threads']) as url:
+                    self.report(kind, loadtest.run(url, **load))
+        except (ValueError, loadtest.LoadTestError) as error:
+            raise CommandError(error)
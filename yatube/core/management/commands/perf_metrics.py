@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    help = 'Показывает метрики запросов по view, собранные middleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести сводку в JSON.')
+        parser.add_argument('--reset', action='store_true',
+                            help='Обнулить счётчики после вывода.')
+
+    def handle(self, *args, **options):
+        report = metrics.snapshot()
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+        else:
+            for view, row in sorted(report.items(),
+                                    key=lambda item: -item[1]['requests']):
+                ratio = row['cache_hit_ratio']
+                self.stdout.write(
+                    f'{view}: {row["requests"]} запр., '
+                    f'среднее {row["avg_ms"]} мс '
+                    f'(p50 ≤ {row["p50_ms"] or "∞"}, '
+                    f'p95 ≤ {row["p95_ms"] or "∞"} мс), '
+                    f'SQL {row["avg_queries"]} за {row["avg_sql_ms"]} мс, '
+                    f'шаблоны {row["avg_template_ms"]} мс, '
+                    f'кэш {"—" if ratio is None else f"{ratio:.0%}"}, '
+                    f'{row["avg_bytes"]} байт'
+                )
+        if options['reset']:
+            metrics.reset()
@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICAS; с --interval повторяет по кругу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Секунд между копированиями; 0 — скопировать один раз.')
+
+    def sync(self, primary):
+        for alias in settings.DATABASE_REPLICAS:
+            replica = settings.DATABASES[alias]
+            started = time.monotonic()
+            source = sqlite3.connect(primary['NAME'])
+            target = sqlite3.connect(replica['NAME'])
+            try:
+                # Копирование по страницам: читатели реплики ждут только
+                # на время записи очередной порции.
+                source.backup(target, pages=1024)
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(
+                f'{alias}: {time.monotonic() - started:.2f} с')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        engines = {settings.DATABASES[alias]['ENGINE']
+                   for alias in ['default', *settings.DATABASE_REPLICAS]}
+        if engines != {'django.db.backends.sqlite3'}:
+            raise CommandError(
+                'Копировать можно только SQLite; реплики других баз '
+                'обновляет сама СУБД.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплик нет: задайте YATUBE_REPLICAS.')
+        while True:
+            self.sync(primary)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,215 @@
+"""Метрики запросов по именам view: время, SQL, шаблоны, кэш, размер.
+
+Замер запроса (Sample) живёт в contextvar, пока запрос обрабатывается:
+SQL считается обёрткой core.hooks.execute_wrapper в любом потоке, шаблоны —
+бэкендом шаблонов core.templating, кэш — бэкендом-обёрткой
+core.cache.MeteredCache; классы Django не подменяются. Сумма и
+гистограмма времени копятся в процессе и раз в FLUSH_EVERY замеров или
+FLUSH_SECONDS секунд прибавляются к общим счётчикам в кэше CACHE_ALIAS,
+так что snapshot() видит все воркеры. Кэш отдельный: в общем LRU
+счётчики молча вытеснялись бы.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import caches
+
+from . import hooks
+
+FIELDS = ('requests', 'total_us', 'sql_queries', 'sql_us', 'template_us',
+          'cache_hits', 'cache_misses', 'bytes')
+# Верхние границы корзин гистограммы полного времени, мс.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+FLUSH_EVERY = 50
+FLUSH_SECONDS = 10
+VIEWS_KEY = 'core:metrics:views'
+CACHE_ALIAS = 'metrics'
+
+_current = ContextVar('core_metrics_sample', default=None)
+_lock = threading.Lock()
+_unflushed = Counter()
+_pending = 0
+_flushed_at = time.monotonic()
+
+
+def _us(seconds):
+    return int(seconds * 1_000_000)
+
+
+class Sample:
+    """Замер одного запроса."""
+
+    def __init__(self):
+        self.values = Counter()
+        self.rendering = False
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.values['sql_queries'] += 1
+            self.values['sql_us'] += _us(time.perf_counter() - started)
+
+    def server_timing(self):
+        values = self.values
+        return ', '.join((
+            f'total;dur={values["total_us"] / 1000:.1f}',
+            f'sql;dur={values["sql_us"] / 1000:.1f};'
+            f'desc="{values["sql_queries"]} queries"',
+            f'tpl;dur={values["template_us"] / 1000:.1f}',
+            f'cache;desc="{values["cache_hits"]} hits, '
+            f'{values["cache_misses"]} misses"',
+        ))
+
+
+@contextmanager
+def record():
+    """Замеряет код внутри блока и отдаёт Sample."""
+    sample = Sample()
+    token = _current.set(sample)
+    started = time.perf_counter()
+    try:
+        with hooks.execute_wrapper(sample.execute):
+            yield sample
+    finally:
+        sample.values['total_us'] += _us(time.perf_counter() - started)
+        _current.reset(token)
+
+
+@contextmanager
+def rendering():
+    """Засчитывает в замер время отрисовки шаблона внутри блока."""
+    sample = _current.get()
+    # Вложенные render_to_string (карточки постов) уже внутри замера.
+    if sample is None or sample.rendering:
+        yield
+        return
+    sample.rendering = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.rendering = False
+        sample.values['template_us'] += _us(time.perf_counter() - started)
+
+
+def count_cache(hits, misses):
+    """Прибавляет попадания и промахи кэша к замеру текущего запроса."""
+    sample = _current.get()
+    if sample is not None:
+        sample.values['cache_hits'] += hits
+        sample.values['cache_misses'] += misses
+
+
+def _bucket(total_us):
+    for bound in BUCKETS_MS:
+        if total_us <= bound * 1000:
+            return f'le_{bound}'
+    return 'le_inf'
+
+
+def add(view, sample):
+    global _pending
+    sample.values['requests'] = 1
+    with _lock:
+        for field, value in sample.values.items():
+            _unflushed[view, field] += value
+        _unflushed[view, _bucket(sample.values['total_us'])] += 1
+        _pending += 1
+        due = (_pending >= FLUSH_EVERY
+               or time.monotonic() - _flushed_at >= FLUSH_SECONDS)
+    if due:
+        flush()
+
+
+def _key(view, field):
+    return f'core:metrics:{view}:{field}'
+
+
+def flush():
+    """Прибавляет накопленное в процессе к общим счётчикам в кэше."""
+    global _flushed_at, _pending
+    with _lock:
+        values = dict(_unflushed)
+        _unflushed.clear()
+        _pending = 0
+        _flushed_at = time.monotonic()
+    if not values:
+        return
+    store = caches[CACHE_ALIAS]
+    views = {view for view, _ in values}
+    known = store.get(VIEWS_KEY, [])
+    if not views <= set(known):
+        store.set(VIEWS_KEY, sorted(views | set(known)), timeout=None)
+    for (view, field), value in values.items():
+        if value:
+            store.add(_key(view, field), 0, timeout=None)
+            store.incr(_key(view, field), value)
+
+
+def _buckets():
+    return [f'le_{bound}' for bound in BUCKETS_MS] + ['le_inf']
+
+
+def percentile(histogram, share):
+    """Верхняя граница корзины, в которую попадает доля share, мс.
+
+    None — дольше последней границы BUCKETS_MS.
+    """
+    total = sum(histogram.values())
+    seen = 0
+    for bound, name in zip(BUCKETS_MS + (None,), _buckets()):
+        seen += histogram.get(name, 0)
+        if total and seen >= total * share:
+            return bound
+    return None
+
+
+def snapshot():
+    """Сводка по view: средние, доли попаданий и оценки p50/p95."""
+    flush()
+    store = caches[CACHE_ALIAS]
+    views = store.get(VIEWS_KEY, [])
+    fields = FIELDS + tuple(_buckets())
+    stored = store.get_many(
+        [_key(view, field) for view in views for field in fields])
+    report = {}
+    for view in views:
+        values = {field: stored.get(_key(view, field), 0)
+                  for field in fields}
+        count = values['requests']
+        if not count:
+            continue
+        histogram = {name: values[name] for name in _buckets()}
+        lookups = values['cache_hits'] + values['cache_misses']
+        report[view] = {
+            'requests': count,
+            'avg_ms': round(values['total_us'] / count / 1000, 2),
+            'p50_ms': percentile(histogram, 0.5),
+            'p95_ms': percentile(histogram, 0.95),
+            'avg_queries': round(values['sql_queries'] / count, 2),
+            'avg_sql_ms': round(values['sql_us'] / count / 1000, 2),
+            'avg_template_ms': round(
+                values['template_us'] / count / 1000, 2),
+            'cache_hit_ratio': (round(values['cache_hits'] / lookups, 3)
+                                if lookups else None),
+            'avg_bytes': values['bytes'] // count,
+            'histogram': histogram,
+        }
+    return report
+
+
+def reset():
+    global _pending
+    with _lock:
+        _unflushed.clear()
+        _pending = 0
+    store = caches[CACHE_ALIAS]
+    views = store.get(VIEWS_KEY, [])
+    store.delete_many([_key(view, field) for view in views
+                       for field in FIELDS + tuple(_buckets())])
+    store.delete(VIEWS_KEY)
@@ -0,0 +1,120 @@
+import asyncio
+import random
+
+from django.conf import settings
+
+from . import db, metrics, nplusone
+
+
+class HybridMiddleware:
+    """Middleware, который и под ASGI работает в цикле событий.
+
+    Синхронный middleware под ASGI Django 3.2 выполняет в общем потоке
+    и держит его, пока ждёт ответ, так что запросы шли бы по очереди.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Метка, по которой Django, как и у MiddlewareMixin, видит
+            # асинхронный middleware.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+
+class PerformanceMiddleware(HybridMiddleware):
+    """Замеряет долю PERF_SAMPLE_RATE запросов, см. core.metrics.
+
+    Стоит первым в MIDDLEWARE, чтобы в замер попали запросы сессий и
+    пользователя. Незамеренные запросы проходят без обёрток.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= settings.PERF_SAMPLE_RATE:
+            return self.get_response(request)
+        with metrics.record() as sample:
+            response = self.get_response(request)
+        return self.finish(request, response, sample)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.PERF_SAMPLE_RATE:
+            return await self.get_response(request)
+        with metrics.record() as sample:
+            response = await self.get_response(request)
+        return self.finish(request, response, sample)
+
+    def finish(self, request, response, sample):
+        if not response.streaming:
+            sample.values['bytes'] += len(response.content)
+        match = getattr(request, 'resolver_match', None)
+        metrics.add(match.view_name if match else 'unresolved', sample)
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = sample.server_timing()
+        return response
+
+
+class NPlusOneMiddleware(HybridMiddleware):
+    """Ищет N+1 в доле NPLUSONE_SAMPLE_RATE запросов, см. core.nplusone."""
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= settings.NPLUSONE_SAMPLE_RATE:
+            return self.get_response(request)
+        with nplusone.detect() as detector:
+            response = self.get_response(request)
+        return self.finish(request, response, detector)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.NPLUSONE_SAMPLE_RATE:
+            return await self.get_response(request)
+        with nplusone.detect() as detector:
+            response = await self.get_response(request)
+        return self.finish(request, response, detector)
+
+    def finish(self, request, response, detector):
+        if detector.problems():
+            if settings.NPLUSONE_RAISE:
+                raise nplusone.NPlusOneError(
+                    f'{request.path}: повторные запросы:\n'
+                    f'{detector.report()}')
+            nplusone.logger.warning(
+                'N+1 в %s:\n%s', request.path, detector.report())
+        return response
+
+
+class ReplicaMiddleware(HybridMiddleware):
+    """Держит состояние роутера реплик на время запроса, см. core.db.
+
+    Стоит раньше SessionMiddleware, чтобы запись сессии тоже закрепляла
+    браузер за основной базой.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state, token = db.begin(pinned=db.PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            db.end(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state, token = db.begin(pinned=db.PIN_COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            db.end(token)
+        return self.finish(response, state)
+
+    def finish(self, response, state):
+        if state.wrote:
+            response.set_cookie(db.PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
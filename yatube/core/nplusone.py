@@ -0,0 +1,101 @@
+"""Поиск N+1: один и тот же запрос из одного места на каждую строку.
+
+Запросы группируются по нормализованному SQL (списки IN и числа
+заменены) и месту вызова: строке шаблона, если запрос сделан при
+отрисовке, иначе первой строке кода проекта в стеке. Группа, в которой
+запросов не меньше NPLUSONE_THRESHOLD, считается N+1. Под тестами
+(core.testrunner) такой запрос роняет тест, в работе — пишется в лог
+для доли NPLUSONE_SAMPLE_RATE запросов.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import hooks
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\((?:%s|\?)(?:,\s*(?:%s|\?))*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+# Обёртки вокруг execute: места вызова в них не ищутся.
+_OWN_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('nplusone.py', 'middleware.py', 'metrics.py', 'hooks.py',
+                 'asyncdb.py')
+}
+_TEMPLATE_BASE = os.path.join('django', 'template', 'base.py')
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def normalize(sql):
+    return _NUMBER.sub('?', _IN_LIST.sub('(...)', sql))
+
+
+def call_site():
+    """Строка шаблона или кода проекта, откуда пришёл запрос."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.endswith(_TEMPLATE_BASE):
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                name = origin.template_name or origin.name
+                return f'{name}:{token.lineno}'
+        elif (filename.startswith(settings.BASE_DIR)
+              and filename not in _OWN_FILES
+              and 'site-packages' not in filename):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.f_lineno}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+class Detector:
+    """Считает запросы по (SQL, место вызова)."""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or settings.NPLUSONE_THRESHOLD
+        self.queries = Counter()
+
+    def execute(self, execute, sql, params, many, context):
+        self.queries[normalize(sql), call_site()] += 1
+        return execute(sql, params, many, context)
+
+    def problems(self):
+        """[(число, место, SQL)] для повторов не реже порога."""
+        return sorted(
+            ((count, site, sql)
+             for (sql, site), count in self.queries.items()
+             if count >= self.threshold),
+            reverse=True
+        )
+
+    def report(self):
+        return '\n'.join(f'{count} раз из {site}: {sql}'
+                         for count, site, sql in self.problems())
+
+
+@contextmanager
+def detect(threshold=None):
+    """Отдаёт Detector, который видит запросы внутри блока."""
+    detector = Detector(threshold)
+    with hooks.execute_wrapper(detector.execute):
+        yield detector
+
+
+@contextmanager
+def assert_no_nplusone(threshold=None):
+    with detect(threshold) as detector:
+        yield detector
+    if detector.problems():
+        raise NPlusOneError(f'Повторные запросы:\n{detector.report()}')
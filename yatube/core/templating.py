@@ -0,0 +1,24 @@
+"""Бэкенд шаблонов Django, отрисовка которых попадает в core.metrics.
+
+Подключается в TEMPLATES вместо DjangoTemplates и ведёт себя так же;
+время render() внешнего шаблона засчитывается в замер запроса.
+"""
+from django.template.backends import django as backend
+
+from . import metrics
+
+
+class Template(backend.Template):
+
+    def render(self, context=None, request=None):
+        with metrics.rendering():
+            return super().render(context, request)
+
+
+class DjangoTemplates(backend.DjangoTemplates):
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Запуск тестов с проверкой каждого запроса к сайту на N+1.
+
+    Реплики и пул потоков core.asyncdb в тестах отключены: это другие
+    соединения, вне транзакции теста, и данные теста в них не видны.
+    Кэши — свои на каждый запуск (и свои файлы при YATUBE_CACHE=sqlite):
+    общий cache.sqlite3 переживает запуски и отдавал бы тестам
+    страницы, собранные по чужой базе.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp()
+        caches = {
+            alias: dict(config, LOCATION=os.path.join(
+                self.cache_dir, f'{alias}.sqlite3'))
+            for alias, config in settings.CACHES.items()
+        }
+        self.test_settings = override_settings(
+            NPLUSONE_RAISE=True, NPLUSONE_SAMPLE_RATE=1.0,
+            DATABASE_REPLICAS=[], ASYNC_DB_THREADS=0, CACHES=caches)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,123 @@
+import asyncio
+import re
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.client import AsyncRequestFactory, RequestFactory
+from django.urls import reverse
+
+from core import asyncdb, db, nplusone
+from posts import async_views, views
+from posts.models import Group, Post
+
+User = get_user_model()
+CSRF = re.compile(r'name="csrfmiddlewaretoken" value="[^"]*"')
+
+
+class AsyncDbPoolTest(TestCase):
+    """Тест пула потоков для синхронного кода асинхронных view."""
+
+    def setUp(self):
+        asyncdb._executor = None
+        self.addCleanup(self.shutdown_pool)
+
+    def shutdown_pool(self):
+        if asyncdb._executor is not None:
+            asyncdb._executor.shutdown()
+        asyncdb._executor = None
+
+    @override_settings(ASYNC_DB_THREADS=2)
+    async def test_pool_is_bounded(self):
+        """Проверяет, что одновременно работает не больше ASYNC_DB_THREADS."""
+        lock = threading.Lock()
+        running, seen, names = [0], [], set()
+
+        def work():
+            with lock:
+                running[0] += 1
+                seen.append(running[0])
+                names.add(threading.current_thread().name)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        await asyncio.gather(*(asyncdb.run(work) for _ in range(6)))
+        self.assertEqual(max(seen), 2)
+        self.assertTrue(all(name.startswith('asyncdb') for name in names))
+
+    @override_settings(ASYNC_DB_THREADS=2)
+    async def test_pool_sees_request_context(self):
+        """Проверяет, что поток пула видит обёртки SQL и роутер запроса."""
+        def work():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return db._state.get()
+
+        state, token = db.begin()
+        try:
+            with nplusone.detect() as detector:
+                seen = await asyncdb.run(work)
+        finally:
+            db.end(token)
+        self.assertIs(seen, state)
+        self.assertIn('SELECT ?', [sql for sql, _ in detector.queries])
+
+
+class AsyncViewsTest(TestCase):
+    """Тест асинхронных страниц posts и ASGI-обработчика."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.group = Group.objects.create(title='Группа', slug='test_group')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='Асинхронный пост')
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_async_views_render_like_sync(self):
+        """Проверяет, что асинхронные страницы отдают то же, что обычные.
+
+        Страницы с формой комментария отличаются только CSRF-токеном,
+        поэтому его значение перед сравнением убирается.
+        """
+        post_id = AsyncViewsTest.post.pk
+        pages = {
+            'index': ('/', {}),
+            'group_posts': ('/group/test_group/', {'slug': 'test_group'}),
+            'profile': ('/profile/FatWhiteFamily/',
+                        {'username': 'FatWhiteFamily'}),
+            'post_detail': (f'/posts/{post_id}/', {'post_id': post_id}),
+            'follow_index': ('/follow/', {}),
+        }
+        for name, (url, kwargs) in pages.items():
+            with self.subTest(view=name):
+                request = AsyncRequestFactory().get(url)
+                request.user = AsyncViewsTest.user
+                response = await getattr(async_views, name)(request, **kwargs)
+                sync_request = RequestFactory().get(url)
+                sync_request.user = AsyncViewsTest.user
+                expected = await asyncdb.run(
+                    getattr(views, name), sync_request, **kwargs)
+                self.assertEqual(response.status_code, 200)
+                if name != 'follow_index':
+                    self.assertIn('Асинхронный пост',
+                                  response.content.decode())
+                self.assertEqual(CSRF.sub('', response.content.decode()),
+                                 CSRF.sub('', expected.content.decode()))
+
+    @override_settings(PERF_SAMPLE_RATE=1.0, PERF_SERVER_TIMING=True)
+    async def test_asgi_handler_counts_queries(self):
+        """Проверяет, что под ASGI замер видит SQL и кэш из потока Django."""
+        url = reverse('posts:group_list', args=('test_group',))
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+        response = await self.async_client.get(url)
+        self.assertNotIn('desc="0 hits', response['Server-Timing'])
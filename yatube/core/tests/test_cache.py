@@ -0,0 +1,98 @@
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from core import metrics
+from core.cache import MeteredCache, SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    """Тест общего кэша в файле SQLite."""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.location = f'{self.temp_dir}/cache.sqlite3'
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_values_shared_between_instances(self):
+        """Проверяет, что запись видна другому объекту с тем же файлом."""
+        self.cache.set('key', {'answer': 42})
+        self.assertEqual(self.make_cache().get('key'), {'answer': 42})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertEqual(self.cache.incr('counter', 2)
+                         if self.cache.add('counter', 1) else None, 3)
+        self.cache.delete('key')
+        self.assertIsNone(self.make_cache().get('key'))
+
+    def test_expired_value_served_stale_to_others(self):
+        """Проверяет, что просроченное значение пересчитывает один клиент."""
+        self.cache.set('key', 'old', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.make_cache().get('key'), 'old')
+        self.cache.set('key', 'new')
+        self.assertEqual(self.make_cache().get('key'), 'new')
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        """Проверяет, что при переполнении уходят давно не читанные."""
+        cache = self.make_cache(MAX_BYTES=11000, LRU_RESOLUTION=0)
+        cache.set('first', 'x' * 3000)
+        cache.set('second', 'x' * 3000)
+        cache.get('first')
+        cache.set('third', 'x' * 3000)
+        cache.set('fourth', 'x' * 3000)
+        self.assertIsNotNone(cache.get('first'))
+        self.assertIsNone(cache.get('second'))
+        total, = cache._db.execute(
+            'SELECT total FROM cache_size').fetchone()
+        self.assertLessEqual(total, 11000)
+
+    def test_connection_and_stats_per_thread(self):
+        """Проверяет, что объекты кэша одного потока делят соединение."""
+        other = self.make_cache()
+        self.assertIs(other._db, self.cache._db)
+        self.cache.get('missing')
+        self.assertEqual(other.stats['misses'], 1)
+        seen = {}
+
+        def work():
+            seen['db'] = self.make_cache()._db
+            seen['stats'] = dict(self.make_cache().stats)
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        self.assertIsNot(seen['db'], self.cache._db)
+        self.assertEqual(seen['stats'], {})
+
+    def test_unbounded_cache_never_evicts(self):
+        """Проверяет, что при MAX_BYTES = None записи не вытесняются."""
+        cache = self.make_cache(MAX_BYTES=None)
+        for number in range(5):
+            cache.set(f'key{number}', 'x' * 3000)
+        self.assertEqual(
+            [cache.get(f'key{number}') is not None for number in range(5)],
+            [True] * 5)
+
+    def test_metered_cache_counts_lookups(self):
+        """Проверяет, что обёртка считает попадания в замер запроса."""
+        cache = MeteredCache(self.location, {'OPTIONS': {
+            'BACKEND': 'core.cache.SQLiteCache', 'MAX_BYTES': 11000}})
+        cache.set('key', 'value')
+        with metrics.record() as sample:
+            self.assertEqual(cache.get('key'), 'value')
+            self.assertIsNone(cache.get('missing'))
+            self.assertEqual(cache.get_many(['key', 'other']),
+                             {'key': 'value'})
+            self.assertIn('key', cache)
+        self.assertEqual(sample.values['cache_hits'], 2)
+        self.assertEqual(sample.values['cache_misses'], 2)
+        self.assertEqual(cache._max_bytes, 11000)
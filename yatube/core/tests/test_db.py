@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import db
+from posts.models import Post
+
+User = get_user_model()
+REPLICAS = ['replica_1', 'replica_2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(TestCase):
+    """Тест чтения с реплик и закрепления за основной базой."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        self.router = db.ReplicaRouter()
+        self.client.force_login(ReplicaRouterTest.user)
+
+    def read_alias(self, pinned=False, model=Post):
+        state, token = db.begin(pinned)
+        try:
+            return db.read_replica(
+                lambda request: self.router.db_for_read(model))(None)
+        finally:
+            db.end(token)
+
+    def test_router(self):
+        """Проверяет, куда роутер отправляет чтение и запись."""
+        self.assertIn(self.read_alias(), REPLICAS)
+        self.assertIsNone(self.read_alias(pinned=True))
+        self.assertIsNone(self.read_alias(model=Session))
+        self.assertIsNone(self.router.db_for_read(Post))
+        state, token = db.begin()
+        state.replica = True
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertIsNone(self.router.db_for_read(Post))
+        db.end(token)
+        self.assertFalse(self.router.allow_migrate('replica_1', 'posts'))
+
+    def get(self, url, **kwargs):
+        # Вместо реплики отдаётся основная база: в тестах реплик нет.
+        with mock.patch('core.db.random.choice',
+                        return_value='default') as choice:
+            response = self.client.get(url, **kwargs)
+        return response, choice.called
+
+    def test_read_only_views_use_replica(self):
+        """Проверяет, что ленты и пост читаются с реплики."""
+        for url in (reverse('posts:index'), reverse('posts:follow_index'),
+                    reverse('posts:profile', args=(self.user.username,)),
+                    reverse('posts:post_detail', args=(self.post.pk,))):
+            with self.subTest(url=url):
+                response, replica = self.get(url)
+                self.assertTrue(replica)
+                self.assertNotIn(db.PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_reads_to_primary(self):
+        """Проверяет, что после записи браузер читает с основной базы."""
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Комментарий'})
+        self.assertEqual(response.cookies[db.PIN_COOKIE]['max-age'], 30)
+        _, replica = self.get(reverse('posts:index'))
+        self.assertFalse(replica)
+        self.client.cookies.pop(db.PIN_COOKIE)
+        _, replica = self.get(reverse('posts:index'))
+        self.assertTrue(replica)
@@ -0,0 +1,112 @@
+import re
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_SERVER_TIMING=True)
+class PerformanceMiddlewareTest(TestCase):
+    """Тест замеров запросов по view."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create(username='FatWhiteFamily')
+        group = Group.objects.create(title='Группа', slug='test_group')
+        Post.objects.create(author=author, group=group, text='Пост')
+        cls.staff = User.objects.create(username='Staff', is_staff=True)
+        cls.url = reverse('posts:group_list', args=(group.slug,))
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_server_timing_header(self):
+        """Проверяет заголовок Server-Timing с числом запросов к базе."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(PerformanceMiddlewareTest.url)
+        timing = response['Server-Timing']
+        for name in ('total;dur=', 'sql;dur=', 'tpl;dur=', 'cache;desc='):
+            self.assertIn(name, timing)
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_skipped(self):
+        """Проверяет, что незамеренный запрос проходит без следов."""
+        response = self.client.get(PerformanceMiddlewareTest.url)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_aggregates_per_view(self):
+        """Проверяет сводку по view в endpoint и в команде."""
+        for _ in range(3):
+            self.client.get(PerformanceMiddlewareTest.url)
+        row = metrics.snapshot()['posts:group_list']
+        self.assertEqual(row['requests'], 3)
+        self.assertEqual(sum(row['histogram'].values()), 3)
+        self.assertGreater(row['avg_queries'], 0)
+        self.assertGreater(row['avg_template_ms'], 0)
+        self.assertGreater(row['avg_bytes'], 0)
+        self.assertGreater(row['cache_hit_ratio'], 0)
+        self.client.force_login(PerformanceMiddlewareTest.staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.json()['posts:group_list']['requests'], 3)
+        out = StringIO()
+        call_command('perf_metrics', reset=True, stdout=out)
+        self.assertIn('posts:group_list: 3 запр.', out.getvalue())
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_counts_cache_of_any_backend(self):
+        """Проверяет попадания и промахи кэша без счётчиков в бэкенде."""
+        caches = dict(settings.CACHES, default={
+            'BACKEND': 'core.cache.MeteredCache',
+            'LOCATION': 'metrics-test',
+            'OPTIONS': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+        })
+        with self.settings(CACHES=caches):
+            self.client.get(PerformanceMiddlewareTest.url)
+            timing = self.client.get(PerformanceMiddlewareTest.url)[
+                'Server-Timing']
+        hits = re.search(r'cache;desc="(\d+) hits', timing).group(1)
+        self.assertGreater(int(hits), 0)
+        self.assertGreater(
+            metrics.snapshot()['posts:group_list']['cache_hit_ratio'], 0)
+
+    def test_counters_survive_cache_clear(self):
+        """Проверяет, что сброс общего кэша не теряет счётчики."""
+        self.client.get(PerformanceMiddlewareTest.url)
+        metrics.flush()
+        cache.clear()
+        self.assertEqual(
+            metrics.snapshot()['posts:group_list']['requests'], 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_access(self):
+        """Проверяет, что сводку видят только staff и владелец токена."""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(
+            url, REMOTE_ADDR='127.0.0.1').status_code, 404)
+        self.assertEqual(self.client.get(
+            url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEqual(self.client.get(
+            url, HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(
+                url, HTTP_AUTHORIZATION='Bearer ').status_code, 404)
+        self.client.force_login(PerformanceMiddlewareTest.staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
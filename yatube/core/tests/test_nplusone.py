@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import nplusone
+from posts.models import Post
+
+User = get_user_model()
+
+
+class NPlusOneTest(TestCase):
+    """Тест поиска повторных запросов на каждую строку."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for i in range(3):
+            author = User.objects.create(username=f'author{i}')
+            Post.objects.create(author=author, text=f'Пост {i}')
+
+    def test_groups_by_statement_and_call_site(self):
+        """Проверяет, что повтор из одной строки кода найден, а разовый нет."""
+        with nplusone.detect() as detector:
+            names = [post.author.username for post in Post.objects.all()]
+        self.assertEqual(len(names), 3)
+        (count, site, sql), = detector.problems()
+        self.assertEqual(count, 3)
+        self.assertRegex(site, r'^core/tests/test_nplusone\.py:\d+$')
+        self.assertIn('"auth_user"."id" = %s', sql)
+        with nplusone.assert_no_nplusone():
+            list(Post.objects.select_related('author'))
+
+    def test_template_call_site(self):
+        """Проверяет, что для запроса из шаблона указана его строка."""
+        template = Template('{% for post in posts %}\n'
+                            '{{ post.author.username }}{% endfor %}')
+        with self.assertRaisesMessage(nplusone.NPlusOneError,
+                                      '3 раз из <unknown source>:2'):
+            with nplusone.assert_no_nplusone():
+                template.render(Context({'posts': Post.objects.all()}))
+
+    @override_settings(NPLUSONE_THRESHOLD=1)
+    def test_middleware_raises_or_logs(self):
+        """Проверяет, что под тестами N+1 роняет запрос, а в работе пишется
+        в лог."""
+        url = reverse('posts:index')
+        with self.assertRaises(nplusone.NPlusOneError):
+            self.client.get(url)
+        with override_settings(NPLUSONE_RAISE=False), \
+                self.assertLogs('core.nplusone', 'WARNING') as logs:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertIn('N+1 в /', logs.output[0])
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import metrics as perf_metrics
 
 
 def page_not_found(request, exception):
@@ -7,3 +12,17 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def _has_metrics_token(request):
+    # REMOTE_ADDR за прокси — адрес прокси, поэтому доступ только по токену.
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+
+
+def metrics(request):
+    """Сводка core.metrics в JSON для staff или по METRICS_TOKEN."""
+    if not (request.user.is_staff or _has_metrics_token(request)):
+        raise Http404
+    return JsonResponse(perf_metrics.snapshot())
@@ -1,15 +1,51 @@
 from django.contrib import admin
+from django.core.cache import cache
 
+from . import search
+from .caching import get_versions
 from .models import Group, Post
+from .paginator import EstimatedCountPaginator
+
+# Сколько лучших совпадений поиска показывать в админке.
+SEARCH_LIMIT = 1000
+
+
+def group_choices():
+    """Варианты выпадающего списка групп, общие для всех строк."""
+    key = 'posts:admin:group_choices:{}'.format(*get_versions(['groups']))
+    choices = cache.get(key)
+    if choices is None:
+        choices = [('', '---------')] + list(
+            Group.objects.order_by('title').values_list('pk', 'title'))
+        cache.set(key, choices)
+    return choices
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date',
                     'author', 'group')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
     list_editable = ('group',)
+    # Совпадает с индексом post_pub_date_idx.
+    ordering = ('-pub_date', '-id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'group':
+            # Иначе каждая строка списка заново выбирает все группы.
+            field.choices = group_choices()
+        return field
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.available():
+            return super().get_search_results(request, queryset, search_term)
+        ids = search.match_ids(search_term, SEARCH_LIMIT)
+        return queryset.filter(pk__in=ids), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -0,0 +1,17 @@
+"""Асинхронные версии читающих страниц для ASGI.
+
+Каждая — тот же view из posts.views со всеми декораторами, выполняемый
+в пуле core.asyncdb, так что медленная страница не держит ни цикл
+событий, ни общий поток Django.
+"""
+from core.asyncdb import async_view
+
+from . import views
+
+index = async_view(views.index)
+group_posts = async_view(views.group_posts)
+profile = async_view(views.profile)
+post_detail = async_view(views.post_detail)
+post_comments = async_view(views.post_comments)
+post_search = async_view(views.post_search)
+follow_index = async_view(views.follow_index)
@@ -0,0 +1,223 @@
+"""Замеры страниц постов: задержка, число SQL-запросов и память.
+
+Каждая страница запрашивается тестовым клиентом на той базе, что
+настроена в settings; большую базу готовит generate_data. Результаты
+сохраняются в JSON как эталон, и следующий прогон сверяется с ним:
+запросов не должно стать больше ни на один, а задержка и память не
+должны вырасти больше чем на допуск. Записи, сделанные формами,
+откатываются, чтобы прогоны шли на одних и тех же данных.
+
+compare_feeds() отдельно сравнивает выборку страницы ленты до и после
+for_feed(): сколько байт приходит из базы и сколько объектов Python
+остаётся в памяти ради страницы.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import timeline
+from .models import Group, Post, User
+
+# Метрики, которые сверяются с эталоном через допуск, и запас сверх
+# допуска: у быстрых страниц шум в пару миллисекунд больше 25 %.
+SLACK = {'p50_ms': 2, 'p95_ms': 5, 'peak_kib': 64}
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def _targets():
+    """Пользователи, группа и пост, на которых строятся запросы."""
+    by_following = User.objects.order_by('-counters__following_count', 'pk')
+    by_followers = User.objects.order_by('-counters__followers_count', 'pk')
+    post = (Post.objects.filter(comments_count__gt=0)
+            .order_by('-pub_date', '-id').first() or Post.objects.first())
+    group = Group.objects.order_by('pk').first()
+    if post is None or group is None:
+        raise ValueError('В базе нет постов или групп, см. generate_data.')
+    return {
+        'reader': by_following.first(),
+        'author': by_followers.first(),
+        'group': group,
+        'post': post,
+    }
+
+
+def scenarios():
+    """Страницы: имя → (метод, адрес, данные формы, нужен ли вход)."""
+    targets = _targets()
+    post_id = targets['post'].pk
+    return targets['reader'], {
+        'index': ('get', reverse('posts:index'), None, False),
+        'group_posts': (
+            'get', reverse('posts:group_list', args=[targets['group'].slug]),
+            None, False),
+        'profile': (
+            'get',
+            reverse('posts:profile', args=[targets['author'].username]),
+            None, False),
+        'post_detail': (
+            'get', reverse('posts:post_detail', args=[post_id]),
+            None, False),
+        'follow_index': ('get', reverse('posts:follow_index'), None, True),
+        'post_create': ('post', reverse('posts:post_create'),
+                        {'text': 'Пост из замера страниц'}, True),
+        'add_comment': ('post', reverse('posts:add_comment', args=[post_id]),
+                        {'text': 'Комментарий из замера страниц'}, True),
+    }
+
+
+def _request(client, method, url, data):
+    response = getattr(client, method)(url, data)
+    if response.status_code >= 400:
+        raise ValueError(f'{method.upper()} {url}: {response.status_code}')
+
+
+def measure(runs=30, warmup=3, warm_cache=False, names=None):
+    """Метрики страниц; без warm_cache кэш чистится перед запросом."""
+    reader, pages = scenarios()
+    guest, member = Client(), Client()
+    member.force_login(reader)
+    results = {}
+    for name, (method, url, data, login) in pages.items():
+        if names and name not in names:
+            continue
+        with transaction.atomic():
+            results[name] = _measure_page(
+                member if login else guest, method, url, data,
+                runs, warmup, warm_cache)
+            transaction.set_rollback(True)
+    return results
+
+
+def _measure_page(client, method, url, data, runs, warmup, warm_cache):
+    timings, queries = [], 0
+    for run in range(warmup + runs):
+        if not warm_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            _request(client, method, url, data)
+            elapsed = time.perf_counter() - started
+        if run >= warmup:
+            timings.append(elapsed)
+            queries = max(queries, len(captured))
+    if not warm_cache:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        _request(client, method, url, data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(_percentile(timings, 0.95) * 1000, 2),
+        'queries': queries,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def over_budget(results, baseline, tolerance):
+    """Строки с нарушениями эталона baseline."""
+    problems = []
+    for name, metrics in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if metrics['queries'] > expected['queries']:
+            problems.append(
+                f'{name}: запросов {metrics["queries"]}, '
+                f'в эталоне {expected["queries"]}')
+        for metric, slack in SLACK.items():
+            limit = expected[metric] * (1 + tolerance) + slack
+            if metrics[metric] > limit:
+                problems.append(
+                    f'{name}: {metric} {metrics[metric]}, '
+                    f'допустимо до {limit:.1f}')
+    return problems
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)['views']
+
+
+def save_baseline(path, results, **meta):
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump({'meta': meta, 'views': results}, stream,
+                  ensure_ascii=False, indent=2, sort_keys=True)
+        stream.write('\n')
+
+
+def _size(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, bytes):
+        return len(value)
+    return 8
+
+
+def feed_querysets():
+    """Ленты: имя → (выборка до for_feed, выборка с for_feed)."""
+    targets = _targets()
+    feeds = {
+        'index': (Post.objects.all(), ''),
+        'group_posts': (targets['group'].posts.all(), ''),
+        'profile': (targets['author'].posts.all(), ''),
+        'follow_index': timeline.feed_rows(targets['reader']),
+    }
+    return {
+        name: (posts.select_related(f'{path}author', f'{path}group'),
+               posts.for_feed())
+        for name, (posts, path) in feeds.items()
+    }
+
+
+def _measure_queryset(queryset, limit):
+    queryset = queryset.order_by('-pub_date', '-id')[:limit]
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        fetched = sum(_size(value)
+                      for row in cursor.fetchall() for value in row)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        page = list(queryset.all())
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    own = tracemalloc.Filter(False, tracemalloc.__file__)
+    blocks = sum(
+        stat.count_diff for stat in after.filter_traces([own]).compare_to(
+            before.filter_traces([own]), 'filename'))
+    return {
+        'rows': len(page),
+        'fetched_kib': round(fetched / 1024, 1),
+        'objects': blocks,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare_feeds(limit=None):
+    """Метрики страницы каждой ленты: имя → {'before': …, 'after': …}."""
+    limit = limit or settings.NUM_OF_POSTS
+    return {
+        name: {'before': _measure_queryset(before, limit),
+               'after': _measure_queryset(after, limit)}
+        for name, (before, after) in feed_querysets().items()
+    }
@@ -0,0 +1,100 @@
+"""Создание постов и комментариев пачкой.
+
+Каждый элемент проверяется той же формой, что и на сайте (PostForm,
+CommentForm), но если ошибка есть хоть в одном, не сохраняется ничего.
+Пачка пишется через bulk_create в одной транзакции. bulk_create не
+посылает сигналов, поэтому счётчики, ленты подписок, поисковый индекс
+и версии кэша обновляются здесь же — по разу на пачку, а не на строку.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from . import caching, counters, search, timeline
+from .forms import BatchPostForm, CommentForm
+from .models import Comment, Group, Post, preview_of
+
+
+def _field(item, name):
+    """Целое значение поля name элемента или None."""
+    try:
+        return int(item[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _validate(make_form, items):
+    """Формы элементов и ошибки {номер: ошибки формы}."""
+    forms, errors = [], {}
+    for number, item in enumerate(items):
+        form = make_form(item if isinstance(item, dict) else {})
+        if not form.is_valid():
+            errors[number] = form.errors.get_json_data()
+        forms.append(form)
+    return forms, errors
+
+
+def _bulk_create(model, objects):
+    """bulk_create, после которого pk есть и у объектов на SQLite."""
+    model.objects.bulk_create(objects)
+    if objects and objects[0].pk is None:
+        # SQLite не возвращает id из INSERT, но блокировка записи держится
+        # до конца транзакции, так что последние id таблицы — наши.
+        ids = model.objects.order_by('-pk').values_list(
+            'pk', flat=True)[:len(objects)]
+        for obj, pk in zip(objects, sorted(ids)):
+            obj.pk = pk
+    return objects
+
+
+def create_posts(author, items):
+    """Посты author из словарей полей PostForm; (посты, ошибки)."""
+    groups = Group.objects.in_bulk(
+        {_field(item, 'group') for item in items} - {None})
+    forms, errors = _validate(
+        lambda data: BatchPostForm(data=data, groups=groups), items)
+    if errors:
+        return [], errors
+    posts = []
+    for form in forms:
+        post = form.save(commit=False)
+        post.author = author
+        post.preview = preview_of(post.text)
+        posts.append(post)
+    with transaction.atomic():
+        _bulk_create(Post, posts)
+        counters.add_posts({author.pk: len(posts)})
+        timeline.fan_out(*posts)
+        search.index_posts([post.pk for post in posts])
+    caching.invalidate_author_feeds(
+        author, {post.group_id for post in posts})
+    return posts, {}
+
+
+def create_comments(author, items):
+    """Комментарии author: словари с id поста (post) и полями формы."""
+    forms, errors = _validate(lambda data: CommentForm(data=data), items)
+    existing = set(Post.objects.filter(
+        pk__in={_field(item, 'post') for item in items} - {None}
+    ).values_list('pk', flat=True))
+    comments = []
+    for number, (form, item) in enumerate(zip(forms, items)):
+        post_id = _field(item, 'post')
+        if post_id not in existing:
+            errors.setdefault(number, {})['post'] = [
+                {'message': 'Пост не найден.', 'code': 'invalid'}]
+        if number in errors:
+            continue
+        comment = form.save(commit=False)
+        comment.author = author
+        comment.post_id = post_id
+        comments.append(comment)
+    if errors:
+        return [], errors
+    with transaction.atomic():
+        _bulk_create(Comment, comments)
+        counters.add_comments(
+            Counter(comment.post_id for comment in comments))
+        search.add_comments(
+            (comment.post_id, comment.text) for comment in comments)
+    return comments, {}
@@ -0,0 +1,197 @@
+"""Кэш отрисованных карточек постов и целых страниц лент.
+
+Ключ карточки собирается из версий поста, его группы и автора, ключ
+страницы — из версии ленты. Версия хранится в кэше и сбрасывается
+сигналами при изменении объекта, после чего старые записи просто
+перестают находиться и вытесняются.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+
+from .models import Group, Post, User
+
+CARD_TEMPLATE = 'posts/includes/article.html'
+STATS_FLUSH_EVERY = 100
+
+card_stats = Counter()
+_unflushed = Counter()
+# Карточки рисуют одновременно потоки gthread и пула core.asyncdb.
+_lock = threading.Lock()
+
+
+def _version_key(name):
+    return f'posts:version:{name}'
+
+
+def get_versions(names):
+    """Текущие версии объектов; отсутствующие создаются заново."""
+    keys = {_version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[_version_key(name)] for name in names]
+
+
+def invalidate(*names):
+    cache.delete_many([_version_key(name) for name in names])
+
+
+def _feeds(username, group_ids):
+    slugs = Group.objects.filter(
+        pk__in=set(group_ids) - {None}).values_list('slug', flat=True)
+    return ['feed:index', f'feed:profile:{username}',
+            *(f'feed:group:{slug}' for slug in slugs)]
+
+
+def invalidate_feeds(post, group_ids=()):
+    """Сбрасывает страницы лент, в которых показывается пост."""
+    invalidate(f'post:{post.pk}', *_feeds(post.author.username,
+                                          [post.group_id, *group_ids]))
+
+
+def invalidate_author_feeds(author, group_ids):
+    """Сбрасывает ленты сразу для пачки новых постов автора."""
+    invalidate(*_feeds(author.username, group_ids))
+
+
+def invalidate_profiles(*user_ids):
+    """Сбрасывает страницы профилей: на них счётчики подписок."""
+    usernames = User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True)
+    invalidate(*(f'feed:profile:{username}' for username in usernames))
+
+
+def _count(event):
+    with _lock:
+        card_stats[event] += 1
+        _unflushed[event] += 1
+        if sum(_unflushed.values()) < STATS_FLUSH_EVERY:
+            return
+        values = dict(_unflushed)
+        _unflushed.clear()
+    for name, value in values.items():
+        key = f'posts:card_stats:{name}'
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, value)
+
+
+def shared_card_stats():
+    """Попадания и промахи всех процессов, сброшенные в общий кэш."""
+    return {
+        name: cache.get(f'posts:card_stats:{name}', 0)
+        for name in ('hits', 'misses')
+    }
+
+
+def hit_ratio(stats):
+    total = stats['hits'] + stats['misses']
+    return stats['hits'] / total if total else 0.0
+
+
+def render_card(context, post):
+    in_group = bool(context.get('group'))
+    versions = get_versions([
+        f'post:{post.pk}',
+        f'group:{post.group_id}',
+        f'user:{post.author_id}',
+    ])
+    key = 'posts:card:{}:{:d}:{}:{}:{}'.format(post.pk, in_group, *versions)
+    html = cache.get(key)
+    if html is not None:
+        _count('hits')
+        return mark_safe(html)
+    _count('misses')
+    template = context.template.engine.get_template(CARD_TEMPLATE)
+    with context.push(post=post):
+        html = template.render(context)
+    cache.set(key, html, settings.POST_CARD_TIMEOUT)
+    return html
+
+
+def cache_feed_page(feed):
+    """Кэширует страницу ленты для анонимных посетителей.
+
+    feed — шаблон имени версии ленты, например 'feed:group:{slug}',
+    подставляются аргументы view. Ответ несёт ETag и Last-Modified,
+    а условный GET с совпавшим ETag получает 304 без запросов к базе.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            if (not settings.ANONYMOUS_PAGE_CACHE
+                    or request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, **kwargs)
+            versions = get_versions([feed.format(**kwargs), 'feed:all'])
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = 'posts:page:{}:{}:{}'.format(path, *versions)
+            cached = cache.get(key)
+            if cached is None:
+                # Фрагменты с {% cache %} живут по таймауту; с версией
+                # ленты в ключе страница не соберётся из устаревших.
+                request.feed_version = key
+                response = view(request, **kwargs)
+                if response.status_code != 200 or response.cookies:
+                    return response
+                etag = '"{}"'.format(
+                    hashlib.md5(response.content).hexdigest())
+                cached = (response.content, response['Content-Type'], etag)
+                cache.set(key, cached, settings.ANONYMOUS_PAGE_CACHE_TIMEOUT)
+            content, content_type, etag = cached
+            last_modified = max(versions) // 10 ** 9
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            ) or HttpResponse(content, content_type=content_type)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def _post_freshness(request, post_id):
+    """ETag и время изменения страницы поста одним запросом по индексам."""
+    if not hasattr(request, '_post_freshness'):
+        row = (
+            Post.objects.filter(pk=post_id)
+            .annotate(last_comment=Max('comments__created'))
+            .values_list('updated', 'last_comment', 'comments_count',
+                         'author__counters__posts_count', 'image_variants',
+                         # Страница показывает группу и имя автора, а их
+                         # переименование не меняет updated поста.
+                         'group__title', 'group__slug', 'author__username',
+                         'author__first_name', 'author__last_name')
+            .first()
+        )
+        freshness = (None, None)
+        if row is not None:
+            updated, last_comment = row[:2]
+            state = ':'.join(map(str, row + (request.user.pk,)))
+            freshness = (
+                hashlib.md5(state.encode()).hexdigest(),
+                max(filter(None, (updated, last_comment))),
+            )
+        request._post_freshness = freshness
+    return request._post_freshness
+
+
+def post_etag(request, post_id):
+    return _post_freshness(request, post_id)[0]
+
+
+def post_last_modified(request, post_id):
+    return _post_freshness(request, post_id)[1]
@@ -0,0 +1,80 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Сигналы и пачки API прибавляют к счётчику разницу одним UPDATE с F(),
+не пересчитывая строки: подписка на популярного автора не считает
+всех его подписчиков. Полный пересчёт подзапросами по индексам
+остаётся для rebuild() — после загрузки в обход сигналов.
+"""
+from django.db.models import (Case, Count, F, IntegerField, OuterRef,
+                              Subquery, Value, When)
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserCounters
+
+
+def _increment(queryset, field, deltas):
+    """Прибавляет к field строк queryset разницы {pk: delta}."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    amount = Case(*(When(pk=pk, then=Value(delta))
+                    for pk, delta in deltas.items()),
+                  output_field=IntegerField())
+    queryset.filter(pk__in=deltas).update(**{field: F(field) + amount})
+
+
+def add_posts(deltas):
+    """Меняет число постов авторов: {id автора: сколько прибавить}."""
+    _increment(UserCounters.objects, 'posts_count', deltas)
+
+
+def add_follow(user_id, author_id, delta):
+    _increment(UserCounters.objects, 'following_count', {user_id: delta})
+    _increment(UserCounters.objects, 'followers_count', {author_id: delta})
+
+
+def add_comments(deltas):
+    """Меняет число комментариев постов: {id поста: сколько прибавить}."""
+    _increment(Post.objects, 'comments_count', deltas)
+
+
+def _count(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def ensure_users(user_ids):
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True
+    )
+
+
+def refresh_users(user_ids=None):
+    counters = UserCounters.objects.all()
+    if user_ids is not None:
+        counters = counters.filter(pk__in=user_ids)
+    counters.update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+
+
+def refresh_posts(post_ids=None):
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    posts.update(comments_count=_count(Comment, 'post'))
+
+
+def rebuild():
+    ensure_users(User.objects.values_list('pk', flat=True))
+    refresh_users()
+    refresh_posts()
@@ -1,6 +1,7 @@
-from django.forms import ModelForm
+from django.core.exceptions import ValidationError
+from django.forms import ModelChoiceField, ModelForm
 
-from .models import Post, Comment
+from .models import Comment, Group, Post
 
 
 class PostForm(ModelForm):
@@ -8,6 +9,54 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файлы, отброшенные ещё при загрузке, см. posts.uploads.
+        self.upload_errors = upload_errors or {}
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, message in self.upload_errors.items():
+            self.add_error(field, message)
+        return cleaned_data
+
+
+class PrefetchedChoiceField(ModelChoiceField):
+    """Выбор из заранее загруженных объектов {pk: объект} без запроса."""
+
+    def __init__(self, objects, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.objects = objects
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(self.error_messages['invalid_choice'],
+                                  code='invalid_choice')
+
+
+class BatchPostForm(PostForm):
+    """PostForm для пачки постов: группы загружаются один раз на пачку.
+
+    Группа — не поле модели формы, иначе full_clean проверял бы её
+    ещё одним запросом на каждый пост.
+    """
+
+    class Meta(PostForm.Meta):
+        fields = ('text', 'image')
+
+    def __init__(self, *args, groups, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'] = PrefetchedChoiceField(
+            groups, Group.objects.all(), required=False)
+
+    def save(self, commit=True):
+        self.instance.group = self.cleaned_data['group']
+        return super().save(commit)
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,226 @@
+"""Синтетические данные для нагрузочных тестов.
+
+Набор воспроизводим: при одном seed и одной исходной базе получаются
+те же пользователи, посты и комментарии. Популярность авторов
+распределена по закону Ципфа: немногие авторы собирают большую часть
+подписчиков, пишут больше постов и чаще получают комментарии, как и в
+настоящей соцсети. Строки вставляются через bulk_create с заранее
+назначенными id, поэтому ссылки между ними не требуют лишних запросов.
+Большие таблицы — посты, комментарии и подписки — пишутся готовыми
+кортежами через executemany: сборка INSERT в ORM обходится дороже
+самой вставки.
+
+Картинки берутся из небольшого пула: файлы хранятся по хэшу
+содержимого (см. storage), и одна картинка у многих постов занимает
+место один раз. Счётчики, ленты и поисковый индекс после вставки
+пересобираются целиком, как и после import_content.
+"""
+import io
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from .models import Comment, Follow, Group, Post, User, preview_of
+from .transfer import insert_rows, rebuild_derived, reset_sequences
+
+BATCH_SIZE = 5000
+# Из этих предложений собираются тексты: Faker на каждый пост слишком
+# медленный для миллионов строк.
+SENTENCES = 3000
+IMAGE_SIZE = (960, 540)
+# Сколько часов в среднем проходит от поста до комментария.
+COMMENT_DELAY_HOURS = 12
+# Доля комментариев, в которых автор поста отвечает в обсуждении.
+AUTHOR_REPLY_SHARE = 0.3
+POST_FIELDS = ('id', 'author', 'text', 'preview', 'group', 'image',
+               'image_variants', 'comments_count', 'pub_date', 'updated')
+COMMENT_FIELDS = ('id', 'post', 'author', 'text', 'created')
+FOLLOW_FIELDS = ('user', 'author')
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса для random.choices: k-й по рангу весит 1/k^s."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Generator:
+    """Создаёт пользователей, подписки, группы, посты и комментарии."""
+
+    def __init__(self, seed=0, exponent=1.1, days=365,
+                 batch_size=BATCH_SIZE, progress=None):
+        self.random = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.exponent = exponent
+        self.days = days
+        self.batch_size = batch_size
+        self.progress = progress
+        self.totals = {}
+        self.started = time.monotonic()
+        self.sentences = [self.fake.sentence(nb_words=10)
+                          for _ in range(SENTENCES)]
+
+    def _count(self, mean):
+        """Случайное количество со средним mean и длинным хвостом."""
+        if mean <= 0:
+            return 0
+        return int(self.random.expovariate(1 / mean))
+
+    def _text(self, sentences):
+        return ' '.join(self.random.choices(
+            self.sentences, k=max(1, self._count(sentences))))
+
+    def _save(self, model, objects, fields=None):
+        """Сохраняет объекты или, если заданы fields, кортежи значений."""
+        if not objects:
+            return
+        with transaction.atomic():
+            if fields:
+                insert_rows(model, fields, objects)
+            else:
+                model.objects.bulk_create(objects)
+        name = model._meta.model_name
+        self.totals[name] = self.totals.get(name, 0) + len(objects)
+        if self.progress:
+            self.progress(name, self.totals[name],
+                          time.monotonic() - self.started)
+
+    def _save_all(self, model, objects, fields=None):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                self._save(model, batch, fields)
+                batch = []
+        self._save(model, batch, fields)
+
+    def users(self, count):
+        """id новых пользователей, от самых популярных авторов."""
+        first = _next_id(User)
+        ids = list(range(first, first + count))
+        self._save_all(User, (
+            # Пароль из одного '!' — неиспользуемый, как у make_password(None).
+            User(id=user_id, username=f'user{user_id}', password='!',
+                 first_name=self.fake.first_name(),
+                 last_name=self.fake.last_name())
+            for user_id in ids
+        ))
+        self.random.shuffle(ids)
+        return ids
+
+    def follows(self, ranked, mean):
+        """Подписки: авторов выбирают пропорционально их популярности."""
+        weights = zipf_weights(len(ranked), self.exponent)
+
+        def rows():
+            for user_id in ranked:
+                count = min(self._count(mean), len(ranked) - 1)
+                authors = set(self.random.choices(
+                    ranked, cum_weights=weights, k=count))
+                authors.discard(user_id)
+                for author_id in sorted(authors):
+                    yield user_id, author_id
+
+        self._save_all(Follow, rows(), FOLLOW_FIELDS)
+
+    def groups(self, count):
+        first = _next_id(Group)
+        ids = list(range(first, first + count))
+        self._save_all(Group, (
+            Group(id=group_id, slug=f'group-{group_id}',
+                  title=self.fake.sentence(nb_words=3).rstrip('.'),
+                  description=self.fake.paragraph())
+            for group_id in ids
+        ))
+        return ids
+
+    def images(self, count):
+        """Имена картинок в хранилище постов, разные по содержимому."""
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for number in range(count):
+            image = Image.new('RGB', IMAGE_SIZE, self._color())
+            draw = ImageDraw.Draw(image)
+            for _ in range(8):
+                left = self.random.randrange(IMAGE_SIZE[0])
+                top = self.random.randrange(IMAGE_SIZE[1])
+                draw.ellipse(
+                    (left, top, left + self.random.randint(40, 400),
+                     top + self.random.randint(40, 400)),
+                    fill=self._color()
+                )
+            content = io.BytesIO()
+            image.save(content, 'JPEG', quality=85)
+            names.append(storage.save(f'posts/generated-{number}.jpg',
+                                      ContentFile(content.getvalue())))
+        return names
+
+    def _color(self):
+        return tuple(self.random.randrange(256) for _ in range(3))
+
+    def posts(self, authors, groups, images, count, group_share=0.6,
+              image_share=0.2, comments=3, sentences=4):
+        """Посты по порядку id и времени, каждый со своими комментариями."""
+        author_weights = zipf_weights(len(authors), self.exponent)
+        group_weights = zipf_weights(len(groups), self.exponent)
+        first = _next_id(Post)
+        comment_id = _next_id(Comment)
+        now = timezone.now()
+        start = now - timedelta(days=self.days)
+        date = connection.ops.adapt_datetimefield_value
+        step = timedelta(days=self.days) / max(count, 1)
+        batch, replies = [], []
+        for number in range(count):
+            pub_date = start + step * (number + self.random.random())
+            author_id, = self.random.choices(
+                authors, cum_weights=author_weights)
+            group_id = image = None
+            if groups and self.random.random() < group_share:
+                group_id, = self.random.choices(
+                    groups, cum_weights=group_weights)
+            if images and self.random.random() < image_share:
+                image = self.random.choice(images)
+            post_id = first + number
+            text = self._text(sentences)
+            batch.append((post_id, author_id, text, preview_of(text),
+                          group_id, image or '', '', 0, date(pub_date),
+                          date(pub_date)))
+            created = pub_date
+            for _ in range(self._count(comments)):
+                created += timedelta(hours=self.random.expovariate(
+                    1 / COMMENT_DELAY_HOURS))
+                if created > now:
+                    break
+                if self.random.random() < AUTHOR_REPLY_SHARE:
+                    commenter = author_id
+                else:
+                    commenter, = self.random.choices(
+                        authors, cum_weights=author_weights)
+                replies.append((comment_id, post_id, commenter,
+                                self._text(1), date(created)))
+                comment_id += 1
+            if len(batch) >= self.batch_size or (
+                    len(replies) >= self.batch_size):
+                self._save(Post, batch, POST_FIELDS)
+                self._save(Comment, replies, COMMENT_FIELDS)
+                batch, replies = [], []
+        self._save(Post, batch, POST_FIELDS)
+        self._save(Comment, replies, COMMENT_FIELDS)
+
+    def finish(self, derived=True):
+        reset_sequences([User, Group, Post, Comment])
+        if derived:
+            rebuild_derived()
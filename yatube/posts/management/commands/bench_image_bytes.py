@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+VIEWPORTS = ('360x3', '390x2', '768x2', '1280x1', '1920x1')
+
+
+def _viewport(value):
+    width, dpr = value.split('x')
+    return int(width), float(dpr)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает объём картинок на первой странице ленты: '
+            'один JPEG 960x339 против вариантов из srcset.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--viewport', action='append', type=_viewport,
+            help='Ширина окна и плотность пикселей, например 390x2. '
+                 'Можно указать несколько раз.'
+        )
+        parser.add_argument(
+            '--posts', type=int, default=settings.NUM_OF_POSTS,
+            help='Сколько последних постов с картинками считать.'
+        )
+
+    def handle(self, *args, **options):
+        viewports = options['viewport'] or list(map(_viewport, VIEWPORTS))
+        names = list(
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True)[:options['posts']]
+        )
+        if not names:
+            self.stdout.write('Нет постов с картинками.')
+            return
+        formats = thumbnails.supported_formats()
+        best = formats[0]
+        before = 0
+        after = dict.fromkeys(viewports, 0)
+        sizes = {}
+        for name in names:
+            frame = thumbnails.load_frame(name)
+            widths = thumbnails.variant_widths(frame)
+            before += len(thumbnails.encode(frame, 'jpeg', 960))
+            for viewport in viewports:
+                width, dpr = viewport
+                # Так же выбирает браузер по sizes и srcset.
+                needed = min(width, thumbnails.ASPECT[0]) * dpr
+                chosen = next((w for w in widths if w >= needed), widths[-1])
+                key = (name, chosen)
+                if key not in sizes:
+                    sizes[key] = len(thumbnails.encode(frame, best, chosen))
+                after[viewport] += sizes[key]
+        self.stdout.write(
+            f'Картинок на странице: {len(names)}, форматы: '
+            f'{", ".join(formats)}'
+        )
+        self.stdout.write(f'До: JPEG 960x339 — {before / 1024:.1f} КиБ')
+        for (width, dpr), total in after.items():
+            self.stdout.write(
+                f'После: {width}px x{dpr:g}, {best} — '
+                f'{total / 1024:.1f} КиБ ({total / before:.0%})'
+            )
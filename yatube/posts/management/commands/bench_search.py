@@ -0,0 +1,99 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from faker import Faker
+
+from posts import search
+from posts.stemmer import stem
+
+
+def _percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку поиска на синтетическом индексе '
+            'в отдельном файле SQLite.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--words', type=int, default=30,
+                            help='Средняя длина поста в словах.')
+        parser.add_argument('--queries', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def build(self, db, options, vocabulary):
+        db.execute(search.CREATE_TABLE)
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        rows = []
+        started = time.monotonic()
+        for post_id in range(1, options['posts'] + 1):
+            length = max(1, int(random.expovariate(1 / options['words'])))
+            post = ' '.join(random.choices(vocabulary, weights, k=length))
+            comments = ' '.join(random.choices(vocabulary, weights, k=5))
+            rows.append((post_id, post, comments))
+            if len(rows) == 10_000:
+                db.executemany(
+                    f'INSERT INTO {search.TABLE} (rowid, post, comments) '
+                    'VALUES (?, ?, ?)', rows)
+                rows = []
+        db.executemany(
+            f'INSERT INTO {search.TABLE} (rowid, post, comments) '
+            'VALUES (?, ?, ?)', rows)
+        db.execute(
+            f"INSERT INTO {search.TABLE} ({search.TABLE}) VALUES ('optimize')")
+        db.commit()
+        return time.monotonic() - started
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        # Основы считаются один раз на словарь, а не на каждое слово поста.
+        vocabulary = sorted({stem(word) for word in fake.words(5000)})
+        random.shuffle(vocabulary)
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            db = sqlite3.connect(path)
+            elapsed = self.build(db, options, vocabulary)
+            self.stdout.write(
+                f'Индекс на {options["posts"]} постов: {elapsed:.1f} с, '
+                f'{os.path.getsize(path) / 1024 / 1024:.1f} МиБ'
+            )
+            frequent = vocabulary[:50]
+            timings = {'count': [], 'page': []}
+            for _ in range(options['queries']):
+                words = random.sample(frequent, 1) + random.sample(
+                    vocabulary, random.randint(0, 1))
+                expression = ' '.join(f'"{word}"' for word in words)
+                started = time.perf_counter()
+                db.execute(
+                    f'SELECT count(*) FROM {search.TABLE} '
+                    f'WHERE {search.TABLE} MATCH ?', (expression,)
+                ).fetchone()
+                timings['count'].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                db.execute(
+                    f'SELECT rowid FROM {search.TABLE} '
+                    f'WHERE {search.TABLE} MATCH ? '
+                    f'ORDER BY {search.RANK} LIMIT ?',
+                    (expression, settings.NUM_OF_POSTS)
+                ).fetchall()
+                timings['page'].append(time.perf_counter() - started)
+            db.close()
+        finally:
+            os.unlink(path)
+        for name, values in timings.items():
+            self.stdout.write(
+                f'{name}: p50 {statistics.median(values) * 1000:.1f} мс, '
+                f'p95 {_percentile(values, 0.95) * 1000:.1f} мс, '
+                f'p99 {_percentile(values, 0.99) * 1000:.1f} мс'
+            )
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from posts import benchmark
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов и память страниц постов '
+            'и сверяет их с сохранённым эталоном.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Не чистить кэш перед запросами.')
+        parser.add_argument(
+            '--views', nargs='+', metavar='VIEW',
+            help='Замерить только эти страницы.')
+        parser.add_argument('--save', metavar='PATH',
+                            help='Записать результаты как эталон.')
+        parser.add_argument('--baseline', metavar='PATH',
+                            help='Сверить результаты с эталоном.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост задержки и памяти, доля от эталона.')
+        parser.add_argument(
+            '--querysets', action='store_true',
+            help='Сравнить выборки лент до и после for_feed().')
+
+    def handle(self, *args, **options):
+        if options['querysets']:
+            return self.compare_feeds()
+        try:
+            results = benchmark.measure(
+                runs=options['runs'], warmup=options['warmup'],
+                warm_cache=options['warm_cache'], names=options['views'])
+        except ValueError as error:
+            raise CommandError(error)
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{name:<14} p50 {metrics["p50_ms"]:>8.2f} мс  '
+                f'p95 {metrics["p95_ms"]:>8.2f} мс  '
+                f'запросов {metrics["queries"]:>3}  '
+                f'память {metrics["peak_kib"]:>8.1f} КиБ'
+            )
+        if options['save']:
+            benchmark.save_baseline(
+                options['save'], results, runs=options['runs'],
+                warm_cache=options['warm_cache'],
+                # Оценка размера таблицы без полного подсчёта.
+                posts=Post.objects.aggregate(last=Max('pk'))['last'])
+        if options['baseline']:
+            problems = benchmark.over_budget(
+                results, benchmark.load_baseline(options['baseline']),
+                options['tolerance'])
+            if problems:
+                raise CommandError(
+                    'Превышен эталон:\n' + '\n'.join(problems))
+            self.stdout.write(self.style.SUCCESS('В пределах эталона.'))
+
+    def compare_feeds(self):
+        try:
+            results = benchmark.compare_feeds()
+        except ValueError as error:
+            raise CommandError(error)
+        for name, stages in results.items():
+            for stage in ('before', 'after'):
+                metrics = stages[stage]
+                self.stdout.write(
+                    f'{name:<14} {stage:<6} строк {metrics["rows"]:>3}  '
+                    f'из базы {metrics["fetched_kib"]:>8.1f} КиБ  '
+                    f'объектов {metrics["objects"]:>6}  '
+                    f'память {metrics["peak_kib"]:>8.1f} КиБ'
+                )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.caching import hit_ratio, shared_card_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает долю попаданий в кэш карточек постов.'
+
+    def handle(self, *args, **options):
+        stats = shared_card_stats()
+        self.stdout.write(
+            f'Попаданий: {stats["hits"]}, промахов: {stats["misses"]}, '
+            f'доля попаданий: {hit_ratio(stats):.1%}'
+        )
@@ -0,0 +1,61 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+PROGRESS_EVERY = 10000
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в JSON Lines '
+            '(один файл) или CSV (по файлу на модель в каталоге).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help="Файл .jsonl, '-' для stdout или каталог для CSV.")
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            default='jsonl')
+        parser.add_argument(
+            '--models', default=','.join(transfer.MODELS),
+            help='Модели через запятую, по умолчанию все.'
+        )
+
+    def report(self, rows, started):
+        total = 0
+        for total, _ in enumerate(rows, 1):
+            if total % PROGRESS_EVERY == 0:
+                elapsed = time.monotonic() - started
+                self.stderr.write(
+                    f'{total} строк, {total / elapsed:.0f} строк/с')
+        return total
+
+    def handle(self, *args, **options):
+        names = options['models'].split(',')
+        unknown = set(names) - set(transfer.MODELS)
+        if unknown:
+            raise CommandError(f'Неизвестные модели: {", ".join(unknown)}')
+        names = [name for name in transfer.MODELS if name in names]
+        path = options['path']
+        started = time.monotonic()
+        total = 0
+        if options['format'] == 'csv':
+            os.makedirs(path, exist_ok=True)
+            for name in names:
+                with open(os.path.join(path, f'{name}.csv'), 'w',
+                          newline='', encoding='utf-8') as stream:
+                    total += self.report(transfer.write_csv(stream, name),
+                                         started)
+        elif path == '-':
+            total = self.report(transfer.write_jsonl(self.stdout, names),
+                                started)
+        else:
+            with open(path, 'w', encoding='utf-8') as stream:
+                total = self.report(transfer.write_jsonl(stream, names),
+                                    started)
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено строк: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
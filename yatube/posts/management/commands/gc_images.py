@@ -0,0 +1,91 @@
+import json
+import os
+import posixpath
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+UPLOAD_DIR = Post._meta.get_field('image').upload_to
+
+
+def _walk(directory):
+    directories, files = default_storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from _walk(posixpath.join(directory, subdirectory))
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки постов и их варианты, на которые не ссылается '
+            'ни один пост.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rehash', action='store_true',
+            help='Сначала переложить файлы со старыми именами под имена '
+                 'по содержимому, чтобы одинаковые склеились.'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд: их пост может '
+                 'быть ещё не сохранён.'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def rehash(self):
+        storage = Post._meta.get_field('image').storage
+        legacy = (
+            Post.objects.exclude(image='')
+            .exclude(image__regex=r'/[0-9a-f]{2}/[0-9a-f]{64}\.[^/]*$')
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        moved = 0
+        for name in legacy.iterator():
+            if not storage.exists(name):
+                continue
+            with storage.open(name) as content:
+                new_name = storage.save(
+                    UPLOAD_DIR + os.path.basename(name), content)
+            # update() без сигналов: варианты остаются прежними.
+            Post.objects.filter(image=name).update(image=new_name)
+            moved += 1
+        self.stdout.write(f'Переложено под имена по содержимому: {moved}')
+
+    def handle(self, *args, **options):
+        if options['rehash'] and not options['dry_run']:
+            self.rehash()
+        referenced = set()
+        for image, variants in Post.objects.exclude(image='').values_list(
+                'image', 'image_variants').iterator():
+            referenced.add(image)
+            try:
+                referenced.update(
+                    variant for by_width in json.loads(variants).values()
+                    for variant in by_width.values()
+                )
+            except (ValueError, TypeError, AttributeError):
+                pass
+        deadline = time.time() - options['min_age']
+        removed = freed = 0
+        # posts/variants/ лежит внутри каталога загрузок: обход один.
+        names = _walk(UPLOAD_DIR.rstrip('/')) if default_storage.exists(
+            UPLOAD_DIR) else ()
+        for name in names:
+            if name in referenced:
+                continue
+            if default_storage.get_modified_time(name).timestamp() > deadline:
+                continue
+            freed += default_storage.size(name)
+            removed += 1
+            if not options['dry_run']:
+                default_storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {removed}, освобождено '
+            f'{freed / 1024 / 1024:.1f} МиБ'
+        ))
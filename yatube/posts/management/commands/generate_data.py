@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.generator import BATCH_SIZE, Generator
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу синтетическими пользователями, подписками, '
+            'постами и комментариями для нагрузочных тестов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--follows', type=float, default=20,
+                            help='Подписок на пользователя в среднем.')
+        parser.add_argument('--comments', type=float, default=3,
+                            help='Комментариев на пост в среднем.')
+        parser.add_argument('--group-share', type=float, default=0.6,
+                            help='Доля постов в группах.')
+        parser.add_argument('--image-share', type=float, default=0.2,
+                            help='Доля постов с картинкой.')
+        parser.add_argument('--images', type=int, default=20,
+                            help='Сколько разных картинок создать.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить посты.')
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель закона Ципфа для популярности авторов.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--no-derived', action='store_true',
+            help='Не пересобирать счётчики, ленты и поисковый индекс.'
+        )
+
+    def progress(self, name, total, elapsed):
+        self.stderr.write(
+            f'{name}: {total} строк, {total / elapsed:.0f} строк/с')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and options['posts']:
+            raise CommandError('Постам нужны авторы: задайте --users.')
+        started = time.monotonic()
+        generator = Generator(
+            seed=options['seed'], exponent=options['exponent'],
+            days=options['days'], batch_size=options['batch_size'],
+            progress=self.progress
+        )
+        users = generator.users(options['users'])
+        generator.follows(users, options['follows'])
+        groups = generator.groups(options['groups'])
+        images = []
+        if options['image_share'] > 0:
+            images = generator.images(options['images'])
+        generator.posts(
+            users, groups, images, options['posts'],
+            group_share=options['group_share'],
+            image_share=options['image_share'],
+            comments=options['comments']
+        )
+        inserted = time.monotonic() - started
+        generator.finish(derived=not options['no_derived'])
+        total = sum(generator.totals.values())
+        self.stderr.write(self.style.SUCCESS(
+            f'Создано строк: {total} за {inserted:.1f} с '
+            f'({total / max(inserted, 1e-9):.0f} строк/с), всего с '
+            f'пересборкой {time.monotonic() - started:.1f} с'
+        ))
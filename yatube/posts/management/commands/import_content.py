@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии и подписки из JSON Lines '
+            'или CSV, выгруженных export_content.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help="Файл .jsonl, '-' для stdin или каталог с CSV.")
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            default='jsonl')
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе.'
+        )
+        parser.add_argument(
+            '--no-derived', action='store_true',
+            help='Не пересобирать счётчики, ленты и поисковый индекс.'
+        )
+
+    def progress(self, name, total, elapsed):
+        self.stderr.write(
+            f'{name}: {total} строк, {total / elapsed:.0f} строк/с')
+
+    def rows(self, options):
+        path = options['path']
+        if options['format'] == 'jsonl':
+            if path == '-':
+                yield from transfer.read_jsonl(sys.stdin)
+                return
+            with open(path, encoding='utf-8') as stream:
+                yield from transfer.read_jsonl(stream)
+            return
+        for name in transfer.MODELS:
+            file_path = os.path.join(path, f'{name}.csv')
+            if os.path.exists(file_path):
+                with open(file_path, newline='', encoding='utf-8') as stream:
+                    yield from transfer.read_csv(stream, name)
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(
+            ignore_conflicts=options['ignore_conflicts'],
+            progress=self.progress
+        )
+        started = time.monotonic()
+        line = 0
+        try:
+            for line, (name, row) in enumerate(self.rows(options), 1):
+                importer.add(name, row)
+            importer.finish(derived=not options['no_derived'])
+        except (ValueError, KeyError) as error:
+            raise CommandError(f'Ошибка около строки {line}: {error!r}')
+        except IntegrityError as error:
+            raise CommandError(
+                f'{error}. Строки, которые уже есть в базе, можно '
+                f'пропустить с --ignore-conflicts.'
+            )
+        total = sum(importer.totals.values())
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Загружено строк: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
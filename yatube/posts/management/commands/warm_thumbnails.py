@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заранее нарезает варианты всех картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Нарезать заново и уже готовые варианты.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['force']:
+            posts = posts.filter(image_variants='')
+        images = (
+            posts
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        started = time.monotonic()
+        done = 0
+        for name in images.iterator():
+            thumbnails.generate(name, force=options['force'])
+            done += 1
+            if done % 100 == 0:
+                self.stdout.write(f'Нарезано: {done}')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Нарезано картинок: {done} за {elapsed:.1f} с'
+        ))
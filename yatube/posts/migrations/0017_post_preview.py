@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:10
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 2000
+
+
+def fill_previews(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    rows = Post.objects.order_by('pk').values_list('pk', 'text')
+    batch = []
+    for pk, text in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(Post(pk=pk, preview=Truncator(text).chars(300)))
+        if len(batch) >= BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['preview'])
+            batch = []
+    Post.objects.bulk_update(batch, ['preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='preview',
+            field=models.CharField(blank=True, editable=False, help_text='Обрезанный текст для карточек в лентах', max_length=300, verbose_name='Начало текста'),
+        ),
+        migrations.RunPython(fill_previews, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,25 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.text import Truncator
+
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
+# Длина начала текста, которое показывают карточки лент.
+PREVIEW_LENGTH = 300
+# Поля, которые нужны карточке поста в лентах (article.html).
+FEED_FIELDS = (
+    'pub_date', 'preview', 'image', 'image_variants', 'author', 'group',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__slug', 'group__title',
+)
+
+
+def preview_of(text):
+    return Truncator(text).chars(PREVIEW_LENGTH)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -18,6 +34,13 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """Посты для лент: без полного текста и лишних полей автора."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
 class Post(models.Model):
     group = models.ForeignKey(
         Group,
@@ -32,10 +55,21 @@ class Post(models.Model):
         verbose_name='Текст поста',
         help_text='Текст нового поста',
     )
+    preview = models.CharField(
+        max_length=PREVIEW_LENGTH,
+        blank=True,
+        editable=False,
+        verbose_name='Начало текста',
+        help_text='Обрезанный текст для карточек в лентах'
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -45,18 +79,49 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name='Изображение',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        # по имени файла считаются ссылки на него
+        db_index=True,
         blank=True
     )
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты изображения',
+        help_text='Нарезанные размеры и форматы изображения в JSON'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         get_latest_by = ['pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:settings.DISP_LETTERS]
 
+    def save(self, *args, **kwargs):
+        self.preview = preview_of(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'preview'}
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -82,6 +147,10 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         get_latest_by = ['created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:settings.DISP_LETTERS]
@@ -103,3 +172,77 @@ class Follow(models.Model):
 
     class Meta:
         verbose_name = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
+
+class TimelineEntryQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """Записи ленты с постами в объёме PostQuerySet.for_feed()."""
+        return self.select_related('post__author', 'post__group').only(
+            'pub_date', 'post', *(f'post__{name}' for name in FEED_FIELDS))
+
+
+class TimelineEntry(models.Model):
+    """Пост в заранее собранной ленте подписчика (fan-out-on-write)."""
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    objects = TimelineEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-id'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+
+class UserCounters(models.Model):
+    """Счётчики пользователя, чтобы страницы не считали COUNT(*)."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='counters',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписок'
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
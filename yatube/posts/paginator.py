@@ -0,0 +1,176 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _isoformat(value):
+    # DjangoJSONEncoder обрезает микросекунды, а для сравнения
+    # по ключу нужно точное значение.
+    return value.isoformat()
+
+
+class CursorPaginator:
+    """Постраничная навигация по ключу сортировки (keyset).
+
+    Вместо OFFSET и COUNT(*) страница выбирается условием по значениям
+    полей сортировки последнего показанного объекта, поэтому любая
+    страница стоит столько же, сколько первая.
+    """
+
+    keyset = True
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [
+            object_list.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, direction, obj):
+        # Строки из .values() приходят словарями.
+        if isinstance(obj, dict):
+            values = [obj[field.name] for field in self.fields]
+        else:
+            values = [getattr(obj, field.attname) for field in self.fields]
+        raw = json.dumps([direction] + values, default=_isoformat)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        padded = cursor + '=' * (-len(cursor) % 4)
+        try:
+            direction, *values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if (direction not in (NEXT, PREVIOUS)
+                    or len(values) != len(self.fields)):
+                raise InvalidCursor(cursor)
+            return direction, [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, binascii.Error) as error:
+            raise InvalidCursor(cursor) from error
+
+    def _seek(self, values, reverse):
+        """Условие «строго после values» в порядке сортировки."""
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.ordering, values):
+            descending = name.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            field = name.lstrip('-')
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def _ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+
+    def page(self, cursor=None):
+        direction, values = NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        reverse = direction == PREVIOUS
+        q_set = self.object_list.order_by(*self._ordering(reverse))
+        if values is not None:
+            q_set = q_set.filter(self._seek(values, reverse))
+        objects = list(q_set[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if reverse:
+            objects.reverse()
+            return CursorPage(objects, self, cursor,
+                              has_next=True, has_previous=has_more)
+        return CursorPage(objects, self, cursor,
+                          has_next=has_more, has_previous=bool(cursor))
+
+    def get_page(self, cursor=None):
+        """Как Paginator.get_page: битый курсор ведёт на первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class CursorPage(Sequence):
+
+    def __init__(self, object_list, paginator, cursor,
+                 has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor or None
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+        # Курсоры считаются по исходным строкам: потом object_list можно
+        # заменить, например записи ленты — их постами.
+        self._bounds = (object_list[0], object_list[-1]) if object_list else ()
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(NEXT, self._bounds[1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.encode_cursor(PREVIOUS, self._bounds[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) по всей таблице.
+
+    Без фильтров число строк оценивается по наибольшему id (один шаг по
+    индексу первичного ключа), с фильтрами считается не дальше
+    exact_limit строк. После удалений оценка бывает завышена, и
+    последние страницы оказываются пустыми.
+    """
+
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        object_list = self.object_list.order_by()
+        if not object_list.query.where:
+            estimate = object_list.aggregate(estimate=Max('pk'))['estimate']
+            if estimate is None or estimate > self.exact_limit:
+                return estimate or 0
+        return object_list[:self.exact_limit].count()
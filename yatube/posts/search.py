@@ -0,0 +1,137 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Индекс — таблица SQLite FTS5: строка на пост, rowid равен id поста,
+в колонках основы слов текста поста и всех его комментариев (см.
+stemmer). Индекс обновляется сигналами в той же транзакции, что и сам
+пост, и отвечает на запрос без сканирования таблицы постов. Выдача
+ранжируется по BM25, совпадение в тексте поста весит больше, чем в
+комментариях.
+"""
+from django.db import connection
+
+from .models import Comment, Post
+from .stemmer import WORD_RE, analyze, stem
+
+TABLE = 'posts_search'
+CREATE_TABLE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} '
+    "USING fts5(post, comments, tokenize='unicode61 remove_diacritics 2')"
+)
+# Веса колонок для bm25(): текст поста и текст комментариев.
+RANK = f'bm25({TABLE}, 2.0, 1.0)'
+BATCH_SIZE = 1000
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Выражение MATCH: все основы слов запроса, каждая в кавычках."""
+    terms = dict.fromkeys(stem(word) for word in WORD_RE.findall(query))
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def index_posts(post_ids):
+    """Переиндексирует посты вместе с их комментариями."""
+    if not available():
+        return
+    post_ids = list(post_ids)
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        batch = post_ids[start:start + BATCH_SIZE]
+        comments = {}
+        for post_id, text in Comment.objects.filter(
+                post_id__in=batch).values_list('post_id', 'text'):
+            comments.setdefault(post_id, []).append(text)
+        rows = [
+            (post_id, analyze(text), analyze(' '.join(
+                comments.get(post_id, ()))))
+            for post_id, text in Post.objects.filter(
+                pk__in=batch).values_list('pk', 'text')
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                               [(post_id,) for post_id in batch])
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, post, comments) '
+                'VALUES (%s, %s, %s)', rows
+            )
+
+
+def add_comments(comments):
+    """Дописывает новые комментарии (post_id, text) в строки их постов.
+
+    Остальные комментарии поста не перечитываются и не проходят через
+    стеммер заново: запись комментария не дорожает с их числом.
+    """
+    if not available():
+        return
+    terms = {}
+    for post_id, text in comments:
+        terms.setdefault(post_id, []).append(analyze(text))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {TABLE} SET comments = comments || ' ' || %s "
+            'WHERE rowid = %s',
+            [(' '.join(texts), post_id) for post_id, texts in terms.items()]
+        )
+
+
+def unindex_posts(post_ids):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                           [(post_id,) for post_id in post_ids])
+
+
+def rebuild():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    index_posts(ids.iterator())
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+def match_ids(query, limit, offset=0):
+    """id постов по запросу query, от самых подходящих."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'ORDER BY {RANK} LIMIT %s OFFSET %s',
+            [expression, limit, offset]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SearchResults:
+    """Выдача поиска для Paginator: считает и режет страницы в индексе."""
+
+    def __init__(self, query):
+        self.query = query
+        self.expression = match_expression(query)
+
+    def count(self):
+        if not self.expression:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {TABLE} WHERE {TABLE} MATCH %s',
+                [self.expression]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        ids = match_ids(self.query, index.stop - start, start)
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
@@ -0,0 +1,94 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, counters, search, storage, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, update_fields,
+                         **kwargs):
+    if created:
+        counters.ensure_users([instance.pk])
+    elif update_fields != frozenset({'last_login'}):
+        # Имя автора есть в карточках всех лент.
+        caching.invalidate(f'user:{instance.pk}', 'feed:all')
+
+
+@receiver(post_save, sender=Group)
+def change_group(sender, instance, created, **kwargs):
+    caching.invalidate('groups')
+    if not created:
+        caching.invalidate(f'group:{instance.pk}', 'feed:all')
+
+
+@receiver(post_delete, sender=Group)
+def delete_group(sender, instance, **kwargs):
+    caching.invalidate('groups')
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # При смене группы надо сбросить и ленту прежней группы.
+    instance._saved_group_id = None
+    instance._replaced_image = None
+    if instance.pk:
+        saved = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image', 'image_variants').first()
+        if saved:
+            instance._saved_group_id, image, variants = saved
+            # Варианты прежней картинки к новой не подходят.
+            if instance.image.name != image:
+                instance.image_variants = ''
+                instance._replaced_image = (image, variants)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.add_posts({instance.author_id: 1})
+        timeline.fan_out(instance)
+    search.index_posts([instance.pk])
+    caching.invalidate_feeds(instance, [instance._saved_group_id])
+    if instance._replaced_image:
+        storage.collect(*instance._replaced_image)
+    if not instance.image_variants:
+        thumbnails.schedule(instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.add_posts({instance.author_id: -1})
+    search.unindex_posts([instance.pk])
+    caching.invalidate_feeds(instance)
+    storage.collect(instance.image.name, instance.image_variants)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.index_posts([instance.post_id])
+        return
+    counters.add_comments({instance.post_id: 1})
+    search.add_comments([(instance.post_id, instance.text)])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.add_comments({instance.post_id: -1})
+    search.index_posts([instance.post_id])
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        counters.add_follow(instance.user_id, instance.author_id, 1)
+        caching.invalidate_profiles(instance.user_id, instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    counters.add_follow(instance.user_id, instance.author_id, -1)
+    caching.invalidate_profiles(instance.user_id, instance.author_id)
+    timeline.prune(instance.user_id, instance.author_id)
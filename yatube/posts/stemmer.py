@@ -0,0 +1,114 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Отрезает окончания, чтобы «котами», «кота» и «коты» попадали в индекс
+одним словом «кот». Алгоритм: http://snowball.tartarus.org/algorithms/
+russian/stemmer.html. Все окончания ищутся только в области RV —
+части слова после первой гласной.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+WORD_RE = re.compile(r'\w+')
+
+
+def _ending(*groups, after_a=()):
+    """Регулярка на окончание; after_a — те, что идут только после а/я."""
+    variants = [f'(?<=[ая])(?:{"|".join(after_a)})'] if after_a else []
+    variants += ['|'.join(group) for group in groups]
+    return f'(?:{"|".join(variants)})'
+
+
+PERFECTIVE_GERUND = re.compile(_ending(
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+    after_a=('в', 'вши', 'вшись')
+) + '$')
+ADJECTIVE = _ending((
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею'
+))
+PARTICIPLE = _ending(
+    ('ивш', 'ывш', 'ующ'),
+    after_a=('ем', 'нн', 'вш', 'ющ', 'щ')
+)
+ADJECTIVAL = re.compile(f'(?:{PARTICIPLE})?{ADJECTIVE}$')
+REFLEXIVE = re.compile('(?:ся|сь)$')
+VERB = re.compile(_ending(
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+    after_a=('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло',
+             'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно')
+) + '$')
+NOUN = re.compile(_ending((
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я'
+)) + '$')
+DERIVATIONAL = re.compile('ость?$')
+SUPERLATIVE = re.compile('ейше?$')
+
+
+def _region(word, start=0):
+    """Начало области после первой согласной, идущей за гласной (R1)."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _cut(pattern, text):
+    """text без найденного окончания или None, если его нет."""
+    match = pattern.search(text)
+    return None if match is None else text[:match.start()]
+
+
+def _strip_ending(rv):
+    """Шаг 1: деепричастие или возвратная частица и одно из окончаний."""
+    cut = _cut(PERFECTIVE_GERUND, rv)
+    if cut is not None:
+        return cut
+    cut = _cut(REFLEXIVE, rv)
+    if cut is not None:
+        rv = cut
+    for pattern in (ADJECTIVAL, VERB, NOUN):
+        cut = _cut(pattern, rv)
+        if cut is not None:
+            return cut
+    return rv
+
+
+def _tidy_up(rv):
+    """Шаг 4: превосходная степень, двойное «н» и мягкий знак."""
+    cut = _cut(SUPERLATIVE, rv)
+    if cut is not None:
+        rv = cut
+    if rv.endswith('нн'):
+        return rv[:-1]
+    if cut is None and rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    first_vowel = next(
+        (i for i, letter in enumerate(word) if letter in VOWELS), None)
+    if first_vowel is None:
+        return word
+    start = first_vowel + 1
+    head, rv = word[:start], word[start:]
+    r2 = _region(word, _region(word)) - start
+
+    rv = _strip_ending(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    match = DERIVATIONAL.search(rv)
+    if match and match.start() >= r2:
+        rv = rv[:match.start()]
+    return head + _tidy_up(rv)
+
+
+def analyze(text):
+    """Текст в виде основ слов через пробел, как он лежит в индексе."""
+    return ' '.join(stem(word) for word in WORD_RE.findall(text))
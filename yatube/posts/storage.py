@@ -0,0 +1,82 @@
+"""Хранилище картинок постов с именами по содержимому.
+
+Файл называется sha256 своего содержимого, поэтому одна и та же
+картинка от разных авторов лежит на диске один раз, и варианты для неё
+нарезаются тоже один раз. Ссылки на файл — это строки Post с таким
+image; когда их не остаётся, collect() удаляет файл и его варианты.
+"""
+import hashlib
+import json
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    """sha256 содержимого; посчитанный при загрузке берётся готовым."""
+    digest = getattr(content, 'content_hash', None)
+    if digest is None:
+        sha = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha.update(chunk)
+        digest = sha.hexdigest()
+    content.seek(0)
+    return digest
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Сохраняет файл как <каталог>/<2 знака хэша>/<хэш><расширение>."""
+
+    def get_available_name(self, name, max_length=None):
+        # Одинаковое имя значит одинаковое содержимое: перезапись не страшна.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = posixpath.split(name)
+        digest = content_hash(content)
+        extension = os.path.splitext(filename)[1].lower()
+        name = posixpath.join(directory, digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Пишем рядом и переименовываем: параллельная загрузка того же
+        # файла не увидит его недописанным.
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(full_path))
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    temp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return name
+
+
+def _delete_unreferenced(name, variants):
+    from .models import Post
+
+    if not name or Post.objects.filter(image=name).exists():
+        return
+    default_storage.delete(name)
+    try:
+        files = [variant for by_width in json.loads(variants).values()
+                 for variant in by_width.values()]
+    except (ValueError, TypeError, AttributeError):
+        files = []
+    for variant in files:
+        default_storage.delete(variant)
+
+
+def collect(name, variants=''):
+    """Удаляет файл и его варианты, если на них больше не ссылаются."""
+    transaction.on_commit(lambda: _delete_unreferenced(name, variants))
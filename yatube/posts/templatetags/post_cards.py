@@ -0,0 +1,23 @@
+from django import template
+
+from posts import thumbnails
+from posts.caching import render_card
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Карточка поста из кэша или article.html, если её там нет."""
+    return render_card(context, post)
+
+
+@register.simple_tag
+def post_picture(post):
+    """Источники для <picture>; если вариантов нет — ставит нарезку."""
+    if not post.image:
+        return None
+    picture = thumbnails.picture(post)
+    if picture is None:
+        thumbnails.requeue(post.image.name)
+    return picture
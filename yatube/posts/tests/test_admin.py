@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.admin import PostAdmin
+from posts.models import Group, Post
+from posts.paginator import EstimatedCountPaginator
+
+User = get_user_model()
+# Запросов на страницу списка постов при любом размере таблицы.
+QUERY_BUDGET = 8
+
+
+class PostAdminTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        cls.url = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(PostAdminTest.admin)
+
+    def add_posts(self, count, groups):
+        groups = [
+            Group.objects.create(title=f'Группа {i}',
+                                 slug=f'group-{count}-{i}', description='')
+            for i in range(groups)
+        ]
+        authors = [User.objects.create(username=f'author-{count}-{i}')
+                   for i in range(5)]
+        for i in range(count):
+            Post.objects.create(text=f'Пост про котов {i}',
+                                author=authors[i % len(authors)],
+                                group=groups[i % len(groups)])
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(PostAdminTest.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_budget_does_not_grow(self):
+        """Проверяет, что число запросов не растёт вместе с таблицей."""
+        self.add_posts(10, groups=2)
+        small = self.changelist_queries()
+        self.add_posts(PostAdmin.list_per_page + 20, groups=30)
+        large = self.changelist_queries()
+        self.assertLessEqual(large, QUERY_BUDGET)
+        self.assertEqual(small, large)
+        for params in (
+            {'pub_date__gte': '2000-01-01 00:00:00+00:00'},
+            {'q': 'котами'},
+            {'p': 1},
+        ):
+            with self.subTest(params=params):
+                self.assertLessEqual(self.changelist_queries(**params),
+                                     QUERY_BUDGET)
+
+    def test_search_uses_index(self):
+        """Проверяет поиск в админке по формам слова."""
+        self.add_posts(3, groups=1)
+        Post.objects.create(text='Про собак', author=PostAdminTest.admin)
+        response = self.client.get(PostAdminTest.url, {'q': 'собака'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_estimated_count(self):
+        """Проверяет, что без фильтров таблица не пересчитывается."""
+        self.add_posts(3, groups=1)
+        with mock.patch.object(EstimatedCountPaginator, 'exact_limit', 2), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(PostAdminTest.url)
+        self.assertGreaterEqual(response.context['cl'].result_count, 3)
+        self.assertFalse(
+            [q for q in queries if 'COUNT(' in q['sql'].upper()])
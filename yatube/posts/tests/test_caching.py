@@ -0,0 +1,176 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.group = Group.objects.create(title='Группа', slug='test_group')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='cached card')
+        cls.url = reverse('posts:group_list', args=(cls.group.slug,))
+
+    def setUp(self):
+        cache.clear()
+        caching.card_stats.clear()
+
+    def test_card_rendered_once(self):
+        """Проверяет, что повторная отрисовка карточки берётся из кэша."""
+        first = self.client.get(PostCardCacheTest.url)
+        second = self.client.get(PostCardCacheTest.url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(caching.card_stats['misses'], 1)
+        self.assertEqual(caching.card_stats['hits'], 1)
+        self.assertEqual(caching.hit_ratio(caching.card_stats), 0.5)
+
+    def test_card_invalidated_on_change(self):
+        """Проверяет, что правка поста, группы и автора сбрасывает карточку."""
+        self.client.get(PostCardCacheTest.url)
+        post = PostCardCacheTest.post
+        post.text = 'edited card'
+        post.save()
+        self.assertContains(self.client.get(PostCardCacheTest.url),
+                            'edited card')
+        user = PostCardCacheTest.user
+        user.first_name = 'Renamed'
+        user.save()
+        self.assertContains(self.client.get(PostCardCacheTest.url),
+                            'Renamed')
+        self.assertEqual(caching.card_stats['hits'], 0)
+
+
+@override_settings(ANONYMOUS_PAGE_CACHE=True)
+class AnonymousPageCacheTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.group_0 = Group.objects.create(title='Группа 0', slug='group_0')
+        cls.group_1 = Group.objects.create(title='Группа 1', slug='group_1')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group_0,
+                                       text='cached page')
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(cls.group_0.slug,)),
+            reverse('posts:profile', args=(cls.user.username,)),
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_served_without_queries(self):
+        """Проверяет, что повтор и условный GET не ходят в базу."""
+        for url in AnonymousPageCacheTest.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                    not_modified = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(first.content, second.content)
+                self.assertTrue(second.has_header('Last-Modified'))
+                self.assertEqual(not_modified.status_code, 304)
+
+    def test_pages_invalidated_by_post_changes(self):
+        """Проверяет, что правка поста сбрасывает страницы его лент."""
+        for url in AnonymousPageCacheTest.urls:
+            self.client.get(url)
+        post = AnonymousPageCacheTest.post
+        post.text = 'edited page'
+        post.group = AnonymousPageCacheTest.group_1
+        post.save()
+        for url in AnonymousPageCacheTest.urls[::2]:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'edited page')
+        self.assertNotContains(
+            self.client.get(AnonymousPageCacheTest.urls[1]), 'edited page')
+
+    def test_profiles_invalidated_by_follow(self):
+        """Проверяет, что подписка и отписка обновляют счётчики профилей."""
+        reader = User.objects.create(username='reader')
+        urls = {
+            reverse('posts:profile', args=(AnonymousPageCacheTest.user,)):
+                'Подписчиков: {}',
+            reverse('posts:profile', args=(reader,)): 'подписок: {}',
+        }
+        for url, text in urls.items():
+            self.assertContains(self.client.get(url), text.format(0))
+        follow = Follow.objects.create(user=reader,
+                                       author=AnonymousPageCacheTest.user)
+        for url, text in urls.items():
+            self.assertContains(self.client.get(url), text.format(1))
+        follow.delete()
+        for url, text in urls.items():
+            self.assertContains(self.client.get(url), text.format(0))
+
+    def test_authenticated_user_not_cached(self):
+        client = Client()
+        client.force_login(AnonymousPageCacheTest.user)
+        client.get(reverse('posts:index'))
+        response = client.get(reverse('posts:index'))
+        self.assertIsNotNone(response.context)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class PostDetailConditionalTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.post = Post.objects.create(author=cls.user, text='fresh post')
+        cls.url = reverse('posts:post_detail', args=(cls.post.pk,))
+
+    def get_if_none_match(self, etag):
+        return self.client.get(PostDetailConditionalTest.url,
+                               HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_post_returns_304_with_one_query(self):
+        """Проверяет, что неизменный пост отдаётся 304 за один запрос."""
+        response = self.client.get(PostDetailConditionalTest.url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            not_modified = self.get_if_none_match(response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_comment_and_edit_change_etag(self):
+        """Проверяет, что комментарий и правка поста меняют ETag."""
+        etag = self.client.get(PostDetailConditionalTest.url)['ETag']
+        Comment.objects.create(post=PostDetailConditionalTest.post,
+                               author=PostDetailConditionalTest.user,
+                               text='new comment')
+        response = self.get_if_none_match(etag)
+        self.assertEqual(response.status_code, 200)
+        post = PostDetailConditionalTest.post
+        post.text = 'edited post'
+        post.save()
+        response = self.get_if_none_match(response['ETag'])
+        self.assertContains(response, 'edited post')
+        self.assertGreater(post.updated, post.pub_date)
+
+    def test_group_and_author_rename_change_etag(self):
+        """Проверяет, что переименование группы и автора меняет ETag."""
+        post = PostDetailConditionalTest.post
+        post.group = Group.objects.create(title='Группа', slug='group')
+        post.save()
+        renames = {
+            post.group: ('title', 'Новая группа'),
+            post.author: ('first_name', 'Новое имя'),
+        }
+        for obj, (field, value) in renames.items():
+            with self.subTest(field=field):
+                etag = self.client.get(PostDetailConditionalTest.url)['ETag']
+                setattr(obj, field, value)
+                obj.save()
+                self.assertContains(self.get_if_none_match(etag), value)
@@ -0,0 +1,201 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.core.paginator import Paginator
+from django.db import connection, models
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts import benchmark, search, timeline
+from posts.models import Comment, Follow, Group, Post
+
+TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+class TransferCommandsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='FatWhiteFamily')
+        cls.reader = User.objects.create(username='Adept')
+        cls.group = Group.objects.create(title='Группа', slug='test_group',
+                                         description='Описание')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Рыжие коты спят на крыше')
+        Post.objects.create(author=cls.reader, text='Без группы')
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Первый комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir)
+
+    def snapshot(self):
+        return {
+            'groups': list(Group.objects.values_list(
+                'id', 'title', 'slug', 'description')),
+            'posts': list(Post.objects.values_list(
+                'id', 'text', 'pub_date', 'updated', 'author__username',
+                'group__slug', 'comments_count')),
+            'comments': list(Comment.objects.values_list(
+                'id', 'post_id', 'author__username', 'text', 'created')),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        }
+
+    def round_trip(self, path, fmt):
+        before = self.snapshot()
+        call_command('export_content', path, format=fmt,
+                     stderr=StringIO())
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('import_content', path, format=fmt,
+                         stderr=StringIO())
+        self.assertEqual(self.snapshot(), before)
+        # Даты пишутся в самом INSERT, а не вторым проходом UPDATE.
+        self.assertFalse([query for query in queries
+                          if query['sql'].startswith('UPDATE "posts_post" '
+                                                     'SET "pub_date"')])
+
+    def test_jsonl_round_trip(self):
+        """Проверяет, что выгрузка в JSON Lines загружается без потерь."""
+        self.round_trip(os.path.join(self.export_dir, 'dump.jsonl'), 'jsonl')
+        reader = User.objects.get(username='Adept')
+        self.assertEqual(reader.counters.following_count, 1)
+        page = timeline.feed_page(
+            reader, lambda rows, post_path: Paginator(rows, 10).page(1))
+        self.assertEqual([post.pk for post in page],
+                         [TransferCommandsTest.post.pk])
+        self.assertEqual(
+            [post.pk for post in search.SearchResults('кот')[0:10]],
+            [TransferCommandsTest.post.pk]
+        )
+
+    def test_csv_round_trip(self):
+        """Проверяет, что выгрузка в CSV загружается без потерь."""
+        self.round_trip(self.export_dir, 'csv')
+
+    def test_ignore_conflicts_keeps_existing_dates(self):
+        """Проверяет, что повторная загрузка не трогает даты в базе."""
+        path = os.path.join(self.export_dir, 'dump.jsonl')
+        call_command('export_content', path, stderr=StringIO())
+        Post.objects.filter(pk=TransferCommandsTest.post.pk).delete()
+        kept = Post.objects.get()
+        kept.updated += timedelta(days=1)
+        Post.objects.filter(pk=kept.pk).update(updated=kept.updated)
+        call_command('import_content', path, ignore_conflicts=True,
+                     stderr=StringIO())
+        restored = Post.objects.get(pk=TransferCommandsTest.post.pk)
+        self.assertEqual(restored.pub_date,
+                         TransferCommandsTest.post.pub_date)
+        self.assertEqual(Post.objects.get(pk=kept.pk).updated, kept.updated)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDataTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def generate(self, **options):
+        options = {'users': 30, 'posts': 80, 'groups': 3, 'follows': 5,
+                   'comments': 2, 'seed': 7, 'batch_size': 25, **options}
+        call_command('generate_data', stderr=StringIO(), **options)
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'author__username', 'group__slug', 'image')),
+            'comments': list(Comment.objects.order_by('pk').values_list(
+                'post_id', 'author__username', 'text')),
+            'follows': list(Follow.objects.order_by('pk').values_list(
+                'user__username', 'author__username')),
+        }
+
+    def test_reproducible_from_seed(self):
+        """Проверяет, что один seed даёт одни и те же данные."""
+        self.generate(image_share=0.5, images=2)
+        first = self.snapshot()
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        self.generate(image_share=0.5, images=2)
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(len(first['posts']), 80)
+        self.assertEqual(len({post[4] for post in first['posts']}), 3)
+
+    def test_realistic_shape(self):
+        """Проверяет связи, даты и пересобранные счётчики."""
+        self.generate(image_share=0)
+        self.assertFalse(Follow.objects.filter(
+            user=models.F('author')).exists())
+        self.assertFalse(Comment.objects.filter(
+            created__lt=models.F('post__pub_date')).exists())
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+        post = Post.objects.annotate(
+            total=models.Count('comments')).order_by('-total').first()
+        self.assertEqual(post.comments_count, post.total)
+        # Популярные авторы собирают непропорционально много подписчиков.
+        followers = sorted(
+            Follow.objects.values('author').annotate(
+                total=models.Count('pk')).values_list('total', flat=True),
+            reverse=True
+        )
+        self.assertGreater(followers[0], 3 * followers[len(followers) // 2])
+        self.assertTrue(search.match_ids(Post.objects.first().text, 5))
+
+
+class BenchViewsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('generate_data', users=10, posts=30, groups=2,
+                     follows=4, image_share=0, stderr=StringIO())
+
+    def setUp(self):
+        self.baseline = os.path.join(tempfile.mkdtemp(), 'views.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.baseline))
+
+    def test_saves_and_checks_baseline(self):
+        """Проверяет эталон: все страницы замерены, рост запросов ловится."""
+        call_command('bench_views', runs=2, warmup=0, save=self.baseline,
+                     stdout=StringIO())
+        with open(self.baseline, encoding='utf-8') as stream:
+            views = json.load(stream)['views']
+        self.assertEqual(set(views), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment'})
+        for metrics in views.values():
+            self.assertGreater(metrics['queries'], 0)
+            self.assertGreater(metrics['peak_kib'], 0)
+        views['index']['queries'] -= 1
+        views['profile']['p95_ms'] = 0
+        with open(self.baseline, 'w', encoding='utf-8') as stream:
+            json.dump({'views': views}, stream)
+        with self.assertRaisesMessage(CommandError, 'index: запросов'):
+            call_command('bench_views', runs=2, warmup=0,
+                         views=['index', 'profile'],
+                         baseline=self.baseline, stdout=StringIO())
+
+    def test_feed_querysets_fetch_less(self):
+        """Проверяет, что for_feed() тянет из базы меньше, чем раньше."""
+        for name, stages in benchmark.compare_feeds().items():
+            with self.subTest(feed=name):
+                before, after = stages['before'], stages['after']
+                self.assertEqual(before['rows'], after['rows'])
+                self.assertLess(after['fetched_kib'], before['fetched_kib'])
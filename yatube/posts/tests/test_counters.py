@@ -0,0 +1,93 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='FatWhiteFamily')
+        cls.reader = User.objects.create(username='Adept')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(CountersTest.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(CountersTest.reader)
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Проверяет, что счётчики меняются вместе с данными."""
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'counted post'})
+        post = Post.objects.get(text='counted post')
+        self.reader_client.post(
+            reverse('posts:add_comment', args=(post.pk,)), {'text': 'hi'})
+        self.reader_client.get(reverse(
+            'posts:profile_follow', args=(CountersTest.author.username,)))
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.counters(CountersTest.author).posts_count, 1)
+        self.assertEqual(
+            self.counters(CountersTest.author).followers_count, 1)
+        self.assertEqual(
+            self.counters(CountersTest.reader).following_count, 1)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', args=(CountersTest.author.username,)))
+        post.delete()
+        self.assertEqual(self.counters(CountersTest.author).posts_count, 0)
+        self.assertEqual(
+            self.counters(CountersTest.author).followers_count, 0)
+
+    def test_follow_does_not_recount(self):
+        """Проверяет, что подписка не пересчитывает подписчиков автора."""
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(reverse(
+                'posts:profile_follow',
+                args=(CountersTest.author.username,)))
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'posts_usercounters' in query['sql']
+                          and 'COUNT(' in query['sql']])
+        self.assertEqual(
+            self.counters(CountersTest.author).followers_count, 1)
+
+    def test_pages_do_not_aggregate(self):
+        """Проверяет, что детали поста и профиль не считают COUNT.
+
+        Профиль открывается по курсору: нумерованным страницам COUNT(*)
+        по-прежнему нужен для числа страниц.
+        """
+        post = Post.objects.create(author=CountersTest.author, text='text')
+        urls = [
+            reverse('posts:post_detail', args=(post.pk,)),
+            reverse('posts:profile', args=(CountersTest.author.username,))
+            + '?cursor=',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.reader_client.get(url)
+                self.assertContains(response, 'Всего постов')
+                self.assertFalse(
+                    [query for query in queries.captured_queries
+                     if 'COUNT(' in query['sql']
+                     and 'posts_usercounters' not in query['sql']])
+
+    def test_rebuild_counters_command(self):
+        Post.objects.create(author=CountersTest.author, text='text')
+        UserCounters.objects.update(posts_count=0)
+        call_command('rebuild_counters', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.counters(CountersTest.author).posts_count, 1)
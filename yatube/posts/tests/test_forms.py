@@ -1,16 +1,31 @@
+import hashlib
+import json
+import os
 import shutil
 import tempfile
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
 from django.urls import reverse
 
 from posts.models import Group, Post, Comment
+from posts.uploads import ImageUploadHandler
 
 TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
 User = get_user_model()
+IMG_DATA = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -92,10 +107,11 @@ class TestPostForm(TestCase):
             'posts:profile', args=(TestPostForm.user.username,)))
         self.assertEqual(1, Post.objects.count())
         upload_dir = self.post._meta.get_field('image').upload_to
+        digest = hashlib.sha256(img_data).hexdigest()
         self.assertTrue(
             Post.objects.filter(
                 text=form_data['text'],
-                image=f'{upload_dir}{uploaded.name}'
+                image=f'{upload_dir}{digest[:2]}/{digest}.jpg'
             ).exists()
         )
 
@@ -146,3 +162,123 @@ class TestPostForm(TestCase):
              f'?next=/posts/{self.post.pk}/comment/')
         )
         self.assertEqual(0, Comment.objects.count())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    """Проверки картинки по ходу загрузки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TolikVihodnoi')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.auth_client = Client()
+        self.auth_client.force_login(ImageUploadTest.user)
+
+    def upload(self, content, name='small.gif'):
+        return self.auth_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'with image',
+                  'image': SimpleUploadedFile(name, content, 'image/gif')}
+        )
+
+    def test_valid_image_streamed_with_hash(self):
+        """Проверяет, что картинка сохраняется, а её хэш считается."""
+        request = RequestFactory().post('/')
+        request.upload_errors = {}
+        handler = ImageUploadHandler(request)
+        handler.new_file('image', 'small.gif', 'image/gif', None)
+        for start in range(0, len(IMG_DATA), 8):
+            handler.receive_data_chunk(IMG_DATA[start:start + 8], start)
+        uploaded = handler.file_complete(len(IMG_DATA))
+        self.assertEqual(uploaded.read(), IMG_DATA)
+        self.assertEqual(uploaded.content_hash,
+                         hashlib.sha256(IMG_DATA).hexdigest())
+        self.assertEqual(request.upload_errors, {})
+        uploaded.close()
+        self.upload(IMG_DATA)
+        self.assertTrue(Post.objects.filter(text='with image').exists())
+
+    def test_not_image_rejected(self):
+        """Проверяет, что файл без заголовка картинки отбрасывается."""
+        response = self.upload(b'just some text', name='fake.gif')
+        self.assertFormError(response, 'form', 'image',
+                             'Загрузите файл с изображением.')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=len(IMG_DATA) - 1)
+    def test_too_big_file_rejected(self):
+        """Проверяет, что слишком большой файл отбрасывается."""
+        response = self.upload(IMG_DATA)
+        self.assertEqual(len(response.context['form'].errors['image']), 1)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=1)
+    def test_too_big_dimensions_rejected(self):
+        """Проверяет, что картинка больших размеров отбрасывается."""
+        response = self.upload(IMG_DATA)
+        self.assertFormError(response, 'form', 'image',
+                             'Изображение больше 1x1 точек.')
+
+    def test_csrf_still_checked(self):
+        """Проверяет, что замена обработчиков не отключает CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(ImageUploadTest.user)
+        response = client.post(reverse('posts:post_create'),
+                               data={'text': 'no token'})
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Post.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ContentAddressedImageTest(TransactionTestCase):
+    """Одинаковые картинки хранятся один раз и удаляются без ссылок."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='TolikVihodnoi')
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user, text=name,
+            image=SimpleUploadedFile(name, IMG_DATA, 'image/gif')
+        )
+
+    def test_same_image_stored_once(self):
+        """Проверяет, что одинаковые картинки делят файл и варианты."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image_variants, '')
+        self.assertEqual(first.image_variants, second.image_variants)
+        _, files = default_storage.listdir(
+            os.path.dirname(first.image.name))
+        self.assertEqual(len(files), 1)
+
+    def test_unreferenced_image_collected(self):
+        """Проверяет, что файл удаляется вместе с последней ссылкой."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        first.refresh_from_db()
+        name = first.image.name
+        variant = next(iter(json.loads(first.image_variants)['jpeg'].values()))
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        second.image = SimpleUploadedFile('other.gif', IMG_DATA + b'\0',
+                                          'image/gif')
+        second.save()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(variant))
+        self.assertTrue(default_storage.exists(second.image.name))
@@ -1,8 +1,12 @@
+from unittest import skipUnless
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
 from django.test import TestCase
 
-from ..models import Group, Post
+from .. import timeline
+from ..models import Follow, Group, Post
 
 User = get_user_model()
 
@@ -43,3 +47,43 @@ class PostTest(TestCase):
                     PostTest.post._meta.get_field(field).help_text,
                     text
                 )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexTest(TestCase):
+    """Проверяет, что ленты читаются по составным индексам."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user_for_tests')
+        cls.group = Group.objects.create(title='Группа', slug='test_slug')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='Тестовый пост для проверки')
+
+    def query_plan(self, q_set):
+        sql, params = q_set.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_feeds_use_composite_indexes(self):
+        feeds = {
+            'post_author_pub_date_idx': FeedIndexTest.user.posts.all(),
+            'post_group_pub_date_idx': FeedIndexTest.group.posts.all(),
+            'comment_post_created_idx': FeedIndexTest.post.comments.all(),
+            'timeline_user_pub_date_idx': timeline.feed_rows(
+                FeedIndexTest.user)[0].for_feed().order_by(
+                    '-pub_date', '-id'),
+        }
+        for index, q_set in feeds.items():
+            with self.subTest(index=index):
+                plan = self.query_plan(q_set[:settings.NUM_OF_POSTS])
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_is_unique(self):
+        Follow.objects.create(user=FeedIndexTest.user,
+                              author=FeedIndexTest.user)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=FeedIndexTest.user,
+                                  author=FeedIndexTest.user)
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginator import CursorPage, CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+
+    NUM_OF_PAGES: int = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        Post.objects.bulk_create(
+            [Post(text=f'text number {i}', author=cls.user)
+             for i in range(settings.NUM_OF_POSTS
+                            * CursorPaginatorTest.NUM_OF_PAGES)]
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True)
+        )
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(),
+                                         settings.NUM_OF_POSTS)
+
+    def test_cursor_walks_forward_and_back(self):
+        """Проверяет, что курсоры проходят ленту целиком в обе стороны."""
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual(len(pages), CursorPaginatorTest.NUM_OF_PAGES)
+        self.assertFalse(pages[0].has_previous())
+        walked = [post.id for page in pages for post in page]
+        self.assertEqual(walked, CursorPaginatorTest.expected)
+        back = self.paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+
+    def test_deep_page_costs_one_query(self):
+        """Проверяет, что страница по курсору — один запрос без COUNT."""
+        cursor = self.paginator.get_page().next_cursor
+        with self.assertNumQueries(1):
+            page = self.paginator.get_page(cursor)
+            len(page)
+
+    def test_broken_cursor_returns_first_page(self):
+        first = self.paginator.get_page()
+        broken = self.paginator.get_page('not-a-cursor')
+        self.assertEqual(list(broken), list(first))
+
+    def test_feed_switches_to_cursor_mode(self):
+        """Проверяет, что ?cursor= переключает ленты в режим курсора."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=(CursorPaginatorTest.user,)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'cursor': ''})
+                page_obj = response.context.get('page_obj')
+                self.assertIsInstance(page_obj, CursorPage)
+                self.assertEqual(len(page_obj), settings.NUM_OF_POSTS)
+                self.assertContains(response, page_obj.next_cursor)
+
+    @override_settings(FEED_PAGINATION='cursor')
+    def test_cursor_mode_from_settings(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertIsInstance(response.context.get('page_obj'), CursorPage)
@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.nplusone import assert_no_nplusone
+from posts import urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ViewQueriesTest(TestCase):
+    """Число запросов каждой страницы не зависит от числа строк на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='test_group')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Пост про котов')
+        cls.rows = 0
+        cls.add_rows(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def add_rows(cls, count):
+        """Авторы с постами в группе, комментариями и подписчиком."""
+        for i in range(cls.rows, cls.rows + count):
+            author = User.objects.create(username=f'writer{i}',
+                                         first_name='Имя', last_name='Ф.')
+            # Картинка ещё не нарезана: карточка рисует заглушку.
+            Post.objects.create(author=author, group=cls.group,
+                                text=f'Ещё пост про котов {i}',
+                                image=SimpleUploadedFile(
+                                    'small.gif', SMALL_GIF, 'image/gif'))
+            Comment.objects.create(post=cls.post, author=author,
+                                   text=f'Комментарий {i}')
+            Follow.objects.create(user=cls.reader, author=author)
+            Follow.objects.create(user=author, author=cls.author)
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост автора про котов {i}')
+        cls.rows += count
+
+    def requests(self):
+        """Запросы ко всем страницам posts: имя → (метод, адрес, данные)."""
+        post_id = ViewQueriesTest.post.pk
+        group_id = ViewQueriesTest.group.pk
+        author = ViewQueriesTest.author.username
+        return {
+            'index': ('get', reverse('posts:index'), None),
+            'group_list': (
+                'get', reverse('posts:group_list', args=('test_group',)),
+                None),
+            'profile': ('get', reverse('posts:profile', args=(author,)),
+                        None),
+            'post_detail': (
+                'get', reverse('posts:post_detail', args=(post_id,)), None),
+            'post_comments': (
+                'get', reverse('posts:post_comments', args=(post_id,)),
+                None),
+            'add_comment': (
+                'post', reverse('posts:add_comment', args=(post_id,)),
+                {'text': 'Новый комментарий'}),
+            'search': ('get', reverse('posts:search'), {'q': 'коты'}),
+            'post_create': ('post', reverse('posts:post_create'),
+                            {'text': 'Новый пост'}),
+            'post_edit': (
+                'post', reverse('posts:post_edit', args=(post_id,)),
+                {'text': 'Пост про котов', 'group': group_id}),
+            'follow_index': ('get', reverse('posts:follow_index'), None),
+            'profile_follow': (
+                'get', reverse('posts:profile_follow', args=(author,)),
+                None),
+            'profile_unfollow': (
+                'get', reverse('posts:profile_unfollow', args=(author,)),
+                None),
+        }
+
+    def count_queries(self):
+        counts = {}
+        for name, (method, url, data) in self.requests().items():
+            user = (ViewQueriesTest.author if name == 'post_edit'
+                    else ViewQueriesTest.reader)
+            self.client.force_login(user)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries, \
+                    assert_no_nplusone():
+                response = getattr(self.client, method)(url, data)
+            self.assertLess(response.status_code, 400, name)
+            counts[name] = len(queries)
+        return counts
+
+    def test_every_view_is_covered(self):
+        """Проверяет, что в проверке есть каждая страница posts."""
+        self.assertEqual(set(self.requests()),
+                         {pattern.name for pattern in urls.urlpatterns})
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Проверяет, что лишние строки не добавляют запросов."""
+        small = self.count_queries()
+        ViewQueriesTest.add_rows(8)
+        self.assertEqual(self.count_queries(), small)
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.stemmer import stem
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.post_match = Post.objects.create(
+            author=cls.user, text='Рыжие коты спят на крыше')
+        cls.comment_match = Post.objects.create(
+            author=cls.user, text='Фотография заката')
+        Comment.objects.create(post=cls.comment_match, author=cls.user,
+                               text='Рядом с котом сидела собака')
+        Post.objects.create(author=cls.user, text='Совсем другой пост')
+        cls.url = reverse('posts:search')
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, query):
+        response = self.client.get(SearchTest.url, {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_stemmer(self):
+        """Проверяет, что формы слова сводятся к одной основе."""
+        self.assertEqual(
+            {stem(word) for word in ('кот', 'коты', 'котами', 'кота')},
+            {'кот'}
+        )
+        self.assertEqual(stem('важнейшие'), 'важн')
+
+    def test_search_ranks_posts_over_comments(self):
+        """Проверяет поиск по формам слова и порядок выдачи."""
+        self.assertEqual(
+            self.found('кот'),
+            [SearchTest.post_match, SearchTest.comment_match]
+        )
+        self.assertEqual(self.found('КОТАМИ'), self.found('кот'))
+        self.assertEqual(self.found('собаками'), [SearchTest.comment_match])
+        self.assertEqual(self.found(''), [])
+        self.assertEqual(self.found('"кот*'), self.found('кот'))
+
+    def test_index_follows_changes(self):
+        """Проверяет, что индекс обновляется при правке и удалении."""
+        post = Post.objects.get(pk=SearchTest.post_match.pk)
+        post.text = 'Рыжие собаки спят на крыше'
+        post.save()
+        self.assertEqual(self.found('собака'),
+                         [post, SearchTest.comment_match])
+        Comment.objects.filter(post=SearchTest.comment_match).delete()
+        self.assertEqual(self.found('кот'), [])
+        post.delete()
+        self.assertEqual(self.found('собака'), [])
+
+    def test_new_comment_does_not_reread_comments(self):
+        """Проверяет, что новый комментарий дописывается в индекс."""
+        post = SearchTest.comment_match
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.create(post=post, author=SearchTest.user,
+                                   text='Под окном прошла лисица')
+        self.assertFalse([query for query in queries
+                          if '"posts_comment"."text"' in query['sql']])
+        self.assertEqual(self.found('лисицы'), [post])
+        self.assertEqual(self.found('собака'), [post])
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Group, Post
+
+TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.group = Group.objects.create(title='Группа', slug='test_group')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='post with image',
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=(
+                    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+                    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+                    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+                    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+                    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+                    b'\x0A\x00\x3B'
+                ),
+                content_type='image/gif'
+            )
+        )
+        cls.url = reverse('posts:group_list', args=(cls.group.slug,))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pending_thumbnail_renders_placeholder(self):
+        """Проверяет, что без готовой миниатюры рисуется заглушка."""
+        response = self.client.get(ThumbnailPipelineTest.url)
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertNotContains(response, '<img class="card-img')
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_generated_variants_replace_placeholder(self):
+        """Проверяет, что готовые варианты сменяют заглушку в карточке."""
+        self.client.get(ThumbnailPipelineTest.url)
+        post = ThumbnailPipelineTest.post
+        thumbnails.generate(post.image.name)
+        post.refresh_from_db()
+        variants = json.loads(post.image_variants)
+        self.assertIn('webp', variants)
+        self.assertIn('jpeg', variants)
+        response = self.client.get(ThumbnailPipelineTest.url)
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, 'srcset="/media/posts/variants/')
+        self.assertContains(response, f'sizes="{thumbnails.SIZES}"')
+        self.assertNotContains(response, 'aspect-ratio: 960 / 339')
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_new_image_drops_old_variants(self):
+        """Проверяет, что варианты прежней картинки не достаются новой."""
+        post = ThumbnailPipelineTest.post
+        thumbnails.generate(post.image.name)
+        post.refresh_from_db()
+        old_variants = post.image_variants
+        content = post.image.read() + b'\0'
+        post.image = SimpleUploadedFile(
+            name='other.gif', content=content, content_type='image/gif'
+        )
+        post.save()
+        post.refresh_from_db()
+        self.assertNotEqual(post.image_variants, old_variants)
+        self.assertIn(hashlib.sha256(content).hexdigest(),
+                      post.image_variants)
+
+    def test_warm_force_rebuilds_existing_variants(self):
+        """Проверяет, что warm_thumbnails --force нарезает заново."""
+        post = ThumbnailPipelineTest.post
+        stale = json.dumps({'jpeg': {'480': 'posts/variants/stale.jpeg'}})
+        Post.objects.filter(pk=post.pk).update(image_variants=stale)
+        call_command('warm_thumbnails', force=True, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertNotIn('stale.jpeg', post.image_variants)
+        self.assertIn('webp', json.loads(post.image_variants))
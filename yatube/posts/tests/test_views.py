@@ -1,16 +1,22 @@
+import hashlib
 import shutil
 import tempfile
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.db import connection
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Page
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts import timeline
 from posts.forms import PostForm
-from posts.models import Group, Post, Comment, Follow
+from posts.models import (PREVIEW_LENGTH, Group, Post, Comment, Follow,
+                          TimelineEntry)
+from posts.paginator import CursorPage
 
 
 TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
@@ -48,6 +54,7 @@ class PostViewTest(TestCase):
             content=img_data,
             content_type='image/jpeg'
         )
+        cls.digest = hashlib.sha256(img_data).hexdigest()
         cls.post = Post.objects.create(
             group=cls.group_0,
             text='text of test article',
@@ -95,9 +102,8 @@ class PostViewTest(TestCase):
         self.assertEqual(post.group, PostViewTest.post.group)
         self.assertEqual(post.pub_date, PostViewTest.post.pub_date)
         upload_dir = post._meta.get_field('image').upload_to
-        self.assertEqual(
-            post.image, f'{upload_dir}{PostViewTest.uploaded.name}'
-        )
+        digest = PostViewTest.digest
+        self.assertEqual(post.image, f'{upload_dir}{digest[:2]}/{digest}.jpg')
 
     def test_pages_use_correct_templates(self):
         """Проверяет, что namespace:name вызывает корректные шаблоны"""
@@ -226,6 +232,64 @@ class PostViewTest(TestCase):
             reverse(PostViewTest.follow_url)).context
         self.check_post(context)
 
+    def test_new_post_fans_out_to_followers(self):
+        """Проверяет, что новый пост попадает в ленту подписчика."""
+        self.auth_client_0.post(reverse('posts:post_create'),
+                                {'text': 'fresh post'})
+        post = Post.objects.get(text='fresh post')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=PostViewTest.user_1, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=PostViewTest.user_0, post=post).exists())
+
+    def test_unfollow_prunes_timeline(self):
+        """Проверяет, что после отписки лента подписчика очищается."""
+        self.auth_client_1.get(reverse(
+            'posts:profile_unfollow',
+            args=(PostViewTest.user_0.username,)
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=PostViewTest.user_1).exists())
+
+    def test_rebuild_matches_fan_out(self):
+        """Проверяет, что пересборка лент даёт те же записи."""
+        def entries():
+            return sorted(TimelineEntry.objects.values_list(
+                'user', 'post', 'pub_date'))
+
+        before = entries()
+        timeline.rebuild()
+        self.assertEqual(entries(), before)
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            timeline.rebuild()
+        self.assertEqual(entries(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_read_on_demand(self):
+        """Проверяет, что посты популярных авторов читаются при запросе."""
+        TimelineEntry.objects.all().delete()
+        cache.clear()
+        context = self.auth_client_1.get(
+            reverse(PostViewTest.follow_url)).context
+        self.check_post(context)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_fanout_limit_is_backfilled(self):
+        """Проверяет, что посты, написанные сверх лимита, раскладываются
+        после отписки, опустившей автора до лимита."""
+        extra = User.objects.create(username='extra')
+        follow = Follow.objects.create(user=extra,
+                                       author=PostViewTest.user_0)
+        post = Post.objects.create(author=PostViewTest.user_0,
+                                   text='written while heavy')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        follow.delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=PostViewTest.user_1, post=post).exists())
+        page = self.auth_client_1.get(
+            reverse(PostViewTest.follow_url)).context['page_obj']
+        self.assertEqual(page[0], post)
+
     def test_follow_page_has_not_post(self):
         """Проверяет что пост не появился на странице подписок."""
         context = self.auth_client_0.get(
@@ -235,6 +299,56 @@ class PostViewTest(TestCase):
             self.check_post(context)
 
 
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentsPageTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.post = Post.objects.create(author=cls.user, text='fresh post')
+        for i in range(5):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'comment number {i}')
+
+    def test_detail_renders_first_page_only(self):
+        """Проверяет, что на странице поста только первая страница."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(CommentsPageTest.post.pk,)))
+        comments = response.context['comments']
+        self.assertIsInstance(comments, CursorPage)
+        self.assertEqual([comment.text for comment in comments],
+                         ['comment number 0', 'comment number 1'])
+        self.assertNotContains(response, 'comment number 2')
+        self.assertContains(response, comments.next_cursor)
+
+    def test_fragment_walks_remaining_pages(self):
+        """Проверяет, что фрагмент по курсору отдаёт остальные комментарии."""
+        url = reverse('posts:post_comments', args=(CommentsPageTest.post.pk,))
+        response = self.client.get(url)
+        texts = []
+        while True:
+            comments = response.context['comments']
+            texts += [comment.text for comment in comments]
+            if not comments.has_next():
+                break
+            response = self.client.get(url, {'cursor': comments.next_cursor})
+        self.assertEqual(texts, [f'comment number {i}' for i in range(5)])
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_page_loads_only_shown_columns(self):
+        """Проверяет, что страница комментариев — один запрос без поста."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:post_comments',
+                                    args=(CommentsPageTest.post.pk,)))
+        comment_queries = [query['sql'] for query in queries
+                           if 'posts_comment"."text' in query['sql']]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertNotIn('"posts_post"', comment_queries[0])
+        self.assertNotIn('"auth_user"."password"', comment_queries[0])
+
+
 class PaginatorTest(TestCase):
 
     PLUS_POSTS: int = 3
@@ -284,3 +398,46 @@ class PaginatorTest(TestCase):
         resp_p_1 = self.auth_client.get(reverse('posts:index'))
         resp_p_2 = self.auth_client.get(reverse('posts:index'), {'page': 2})
         self.assertNotEqual(resp_p_1.content, resp_p_2.content)
+
+
+class FeedColumnsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FatWhiteFamily')
+        cls.group = Group.objects.create(title='Группа', slug='test_group')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='long post ' * 100)
+        Follow.objects.create(user=cls.user, author=cls.user)
+
+    def test_preview_follows_text(self):
+        """Проверяет, что preview — обрезанный текст и меняется с ним."""
+        post = FeedColumnsTest.post
+        self.assertEqual(len(post.preview), PREVIEW_LENGTH)
+        self.assertTrue(post.preview.endswith('…'))
+        post.text = 'short post'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.preview, 'short post')
+
+    def test_feeds_load_only_card_columns(self):
+        """Проверяет, что ленты не грузят текст поста и лишнее об авторе."""
+        self.client.force_login(FeedColumnsTest.user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('test_group',)),
+            reverse('posts:profile', args=(FeedColumnsTest.user.username,)),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertContains(response, 'long post')
+                feed = [query['sql'] for query in queries
+                        if '"posts_post"."preview"' in query['sql']]
+                self.assertEqual(len(feed), 1)
+                self.assertNotIn('"posts_post"."text"', feed[0])
+                self.assertNotIn('"auth_user"."password"', feed[0])
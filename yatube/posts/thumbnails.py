@@ -0,0 +1,201 @@
+"""Фоновая нарезка картинок постов.
+
+Из картинки заранее готовится кадр 960x339 нескольких ширин в WebP
+(и в AVIF, если его умеет Pillow) и в JPEG для старых браузеров.
+Имена вариантов записываются в Post.image_variants, поэтому шаблону
+не нужно обращаться к хранилищу. Нарезка идёт в пуле потоков сразу
+после сохранения поста, а не при первом показе. Пока вариантов нет,
+шаблон рисует заглушку: запрос никогда не ждёт обработки картинки.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image
+
+from . import caching
+from .models import Post
+
+ASPECT = (960, 339)
+WIDTHS = (480, 960, 1440)
+SIZES = '(max-width: 960px) 100vw, 960px'
+# Порядок важен: браузер берёт первый подходящий <source>.
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 50}),
+    'webp': ('WEBP', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg',
+             {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'posts/variants/'
+# Сколько ждать готовности, прежде чем поставить картинку в очередь снова.
+PENDING_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def supported_formats():
+    Image.init()
+    return [fmt for fmt, (encoder, *_) in FORMATS.items()
+            if encoder in Image.SAVE]
+
+
+def _crop(image):
+    """Кадр по центру с пропорциями ASPECT."""
+    width, height = image.size
+    ratio = ASPECT[0] / ASPECT[1]
+    if width / height > ratio:
+        new_width = max(1, round(height * ratio))
+        left = (width - new_width) // 2
+        return image.crop((left, 0, left + new_width, height))
+    new_height = max(1, round(width / ratio))
+    top = (height - new_height) // 2
+    return image.crop((0, top, width, top + new_height))
+
+
+def encode(frame, fmt, width):
+    """Байты варианта кадра frame шириной width в формате fmt."""
+    encoder, _, options = FORMATS[fmt]
+    height = round(width * ASPECT[1] / ASPECT[0])
+    buffer = BytesIO()
+    frame.resize((width, height), Image.LANCZOS).save(
+        buffer, encoder, **options)
+    return buffer.getvalue()
+
+
+def load_frame(name):
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image.load()
+    return _crop(image.convert('RGB'))
+
+
+def variant_widths(frame):
+    # Варианты шире исходника не нужны, самый узкий делается всегда.
+    return [w for w in WIDTHS if w <= frame.width] or list(WIDTHS[:1])
+
+
+def build_variants(name):
+    """Нарезает картинку и возвращает {формат: {ширина: имя файла}}."""
+    frame = load_frame(name)
+    widths = variant_widths(frame)
+    stem = os.path.splitext(name)[0].replace('/', '_')
+    variants = {}
+    for fmt in supported_formats():
+        variants[fmt] = {}
+        for width in widths:
+            variant = f'{VARIANTS_DIR}{stem}_{width}.{fmt}'
+            if default_storage.exists(variant):
+                default_storage.delete(variant)
+            variants[fmt][width] = default_storage.save(
+                variant, ContentFile(encode(frame, fmt, width)))
+    return variants
+
+
+def picture(post):
+    """Источники для <picture> из вариантов поста или None."""
+    try:
+        variants = json.loads(post.image_variants)
+        fallback = variants['jpeg']
+    except (ValueError, TypeError, KeyError):
+        # Пусто или записано не нами: считаем, что вариантов нет.
+        return None
+
+    def srcset(files):
+        return ', '.join(
+            f'{default_storage.url(files[width])} {width}w'
+            for width in sorted(files, key=int)
+        )
+
+    width = min(fallback, key=lambda w: abs(int(w) - ASPECT[0]))
+    return {
+        'sources': [{'type': FORMATS[fmt][1], 'srcset': srcset(files)}
+                    for fmt, files in variants.items() if fmt != 'jpeg'],
+        'src': default_storage.url(fallback[width]),
+        'srcset': srcset(fallback),
+        'sizes': SIZES,
+    }
+
+
+def shared_variants(name):
+    """Варианты той же картинки, уже нарезанные для другого поста."""
+    return (
+        Post.objects.filter(image=name).exclude(image_variants='')
+        .values_list('image_variants', flat=True).first()
+    )
+
+
+def generate(name, force=False):
+    """Нарезает картинку name и записывает варианты всем её постам.
+
+    Без force готовые варианты той же картинки у другого поста берутся
+    как есть; force нарезает заново, даже если варианты уже есть.
+    """
+    try:
+        variants = None if force else shared_variants(name)
+        variants = variants or json.dumps(build_variants(name))
+        Post.objects.filter(image=name).update(image_variants=variants)
+        # Заглушку могли успеть закэшировать в карточках и страницах.
+        for post in Post.objects.select_related('author').filter(image=name):
+            caching.invalidate_feeds(post)
+    except Exception:
+        logger.exception('Не удалось нарезать картинку %s', name)
+
+
+def _generate_in_pool(name):
+    try:
+        generate(name)
+    finally:
+        # У каждого потока пула своё соединение с базой.
+        connection.close()
+
+
+def _mark_pending(name):
+    return cache.add(f'posts:variants:{name}:pending', True,
+                     PENDING_TIMEOUT)
+
+
+def schedule(name):
+    """После сохранения поста ставит картинку в очередь на нарезку."""
+    if not name:
+        return
+    # Та же картинка у другого поста уже нарезана: берём её варианты.
+    variants = shared_variants(name)
+    if variants:
+        Post.objects.filter(image=name, image_variants='').update(
+            image_variants=variants)
+        return
+    if not _mark_pending(name):
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        generate(name)
+        return
+    transaction.on_commit(lambda: _pool().submit(_generate_in_pool, name))
+
+
+def requeue(name):
+    """Снова ставит в пул картинку, которую шаблон нашёл без вариантов.
+
+    Шаблон ходит только в кэш: страница может читаться с реплики, а
+    без пула нарезка идёт при сохранении поста или warm_thumbnails.
+    """
+    if name and settings.THUMBNAIL_WORKERS and _mark_pending(name):
+        transaction.on_commit(
+            lambda: _pool().submit(_generate_in_pool, name))
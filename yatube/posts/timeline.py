@@ -0,0 +1,152 @@
+"""Лента «Избранные авторы», собранная заранее (fan-out-on-write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора, поэтому
+страница подписок читает одну таблицу по индексу (user, -pub_date).
+Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+не раскладываются, а подмешиваются при чтении (fan-out-on-read).
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def _follower_ids(author_id):
+    """Подписчики автора или None, если их больше лимита раскладки."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    ids = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)[:limit + 1]
+    )
+    if len(ids) > limit:
+        return None
+    return ids
+
+
+def heavy_authors(user):
+    """Авторы из подписок user, чьи посты не раскладываются по лентам."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__counters__followers_count__gt=(
+                settings.TIMELINE_FANOUT_LIMIT)
+        ).values_list('author', flat=True)
+    )
+
+
+def fan_out(*posts):
+    """Раскладывает посты по лентам подписчиков их авторов.
+
+    Записи собирает сама база, INSERT ... SELECT на пачку постов автора:
+    посты популярного автора на всех подписчиков в памяти не держатся.
+    """
+    post_ids = {}
+    for post in posts:
+        post_ids.setdefault(post.author_id, []).append(post.pk)
+    for author_id, ids in post_ids.items():
+        if _follower_ids(author_id) is None:
+            continue
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            _fill('f.author_id = %s AND p.id IN ({})'.format(
+                ', '.join(['%s'] * len(batch))), [author_id, *batch])
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика уже написанные посты автора."""
+    if _follower_ids(author_id) is None:
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    # Отписка могла опустить автора до лимита раскладки. Его посты,
+    # написанные, пока подписчиков было больше, ни в одну ленту не
+    # попали, а читать их при запросе больше не будут.
+    followers = _follower_ids(author_id)
+    if followers is not None and (
+            len(followers) == settings.TIMELINE_FANOUT_LIMIT):
+        _fill('f.author_id = %s AND NOT EXISTS (SELECT 1 FROM {entries} e '
+              'WHERE e.user_id = f.user_id AND e.post_id = p.id)',
+              [author_id])
+
+
+def _fill(where, params):
+    """Записи лент одним INSERT ... SELECT по подпискам из where."""
+    quote = connection.ops.quote_name
+    entries = quote(TimelineEntry._meta.db_table)
+    follows = quote(Follow._meta.db_table)
+    posts = quote(Post._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.pub_date FROM {follows} f '
+            f'JOIN {posts} p ON p.author_id = f.author_id '
+            'WHERE ' + where.format(entries=entries, follows=follows),
+            params
+        )
+
+
+def rebuild():
+    """Пересобирает ленты всех подписчиков с нуля.
+
+    Одним INSERT ... SELECT: по backfill() на подписку миллионы строк
+    лент проходили бы через ORM по одной.
+    """
+    TimelineEntry.objects.all().delete()
+    _fill('f.author_id IN (SELECT author_id FROM {follows} '
+          'GROUP BY author_id HAVING COUNT(*) <= %s)',
+          [settings.TIMELINE_FANOUT_LIMIT])
+
+
+def feed_rows(user):
+    """Строки ленты подписок user и путь от строки к полям поста.
+
+    Обычно это записи TimelineEntry (путь 'post__'): страница — один
+    проход по индексу (user, -pub_date, -id), пост подтягивается JOIN
+    по первичному ключу. Если среди авторов есть тяжёлые, их посты
+    подмешиваются при чтении и строками становятся сами посты (путь '').
+    """
+    heavy = heavy_authors(user)
+    if not heavy:
+        return TimelineEntry.objects.filter(user=user), 'post__'
+    in_timeline = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(
+        Q(pk__in=in_timeline) | Q(author__in=heavy)), ''
+
+
+def _post_of(row, post_path):
+    if isinstance(row, dict):
+        return {key[len(post_path):]: value for key, value in row.items()
+                if key.startswith(post_path)}
+    return row.post
+
+
+def feed_page(user, paginate):
+    """Страница ленты подписок user, на которой лежат посты.
+
+    paginate(rows, post_path) листает строки из feed_rows() по ключу
+    (-pub_date, -id) и возвращает страницу объектов или словарей
+    .values(), в которых поля поста выбраны с приставкой post_path.
+    Затем строки заменяются постами: объекты — объектами Post,
+    словари — словарями полей поста без приставки.
+    """
+    rows, post_path = feed_rows(user)
+    page = paginate(rows, post_path)
+    if post_path:
+        page.object_list = [_post_of(row, post_path)
+                            for row in page.object_list]
+    return page
@@ -0,0 +1,106 @@
+"""Потоковый приём картинок постов.
+
+Файл пишется на диск кусками, поэтому память на загрузку не зависит
+от размера файла. Заголовок картинки разбирается по первым байтам:
+не картинка, слишком большой файл или слишком большие размеры
+отбрасываются сразу, не дожидаясь конца загрузки и form.is_valid().
+Попутно считается sha256 содержимого.
+"""
+import hashlib
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+ALLOWED_FORMATS = ('GIF', 'JPEG', 'PNG', 'WEBP')
+# Столько байт от начала файла хватает на заголовок с EXIF и ICC.
+HEADER_BYTES = 256 * 1024
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Пишет файл во временный файл и проверяет его по ходу загрузки."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra
+        )
+        self.hash = hashlib.sha256()
+        self.header = bytearray()
+        self.checked = False
+        if (self.content_length
+                and self.content_length > settings.POST_IMAGE_MAX_BYTES):
+            self.reject(self.too_big())
+
+    def reject(self, message):
+        self.request.upload_errors[self.field_name] = message
+        raise SkipFile
+
+    def too_big(self):
+        return (f'Файл больше '
+                f'{filesizeformat(settings.POST_IMAGE_MAX_BYTES)}.')
+
+    def check_header(self, final=False):
+        max_side = settings.POST_IMAGE_MAX_SIDE
+        too_big = f'Изображение больше {max_side}x{max_side} точек.'
+        try:
+            image = Image.open(BytesIO(bytes(self.header)))
+        except Image.DecompressionBombError:
+            self.reject(too_big)
+        except OSError:
+            # Заголовок может ещё не дойти целиком.
+            if final or len(self.header) >= HEADER_BYTES:
+                self.reject('Загрузите файл с изображением.')
+            return
+        if image.format not in ALLOWED_FORMATS:
+            self.reject(f'Формат {image.format} не поддерживается.')
+        if max(image.size) > max_side:
+            self.reject(too_big)
+        self.checked = True
+        self.header = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.POST_IMAGE_MAX_BYTES:
+            self.reject(self.too_big())
+        if not self.checked:
+            self.header += raw_data[:HEADER_BYTES - len(self.header)]
+            self.check_header()
+        self.hash.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.checked:
+            try:
+                self.check_header(final=True)
+            except SkipFile:
+                # Здесь SkipFile парсер уже не ловит: файл просто не отдаём.
+                self.file.close()
+                return None
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_hash = self.hash.hexdigest()
+        return self.file
+
+
+def stream_image_uploads(view):
+    """Принимает файлы запроса через ImageUploadHandler.
+
+    Обработчики загрузки можно заменить, только пока тело запроса не
+    разобрано, а CsrfViewMiddleware читает request.POST раньше view.
+    Поэтому CSRF проверяется здесь, уже после замены обработчиков.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_errors = {}
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return wrapper
@@ -1,20 +1,28 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 app_name = 'posts'
+# Под ASGI читающие страницы отдают асинхронные версии.
+read = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('group/<slug:slug>/', views.group_posts, name='group_list'),
-    path('profile/<str:username>/', views.profile, name='profile'),
-    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('', read.index, name='index'),
+    path('group/<slug:slug>/', read.group_posts, name='group_list'),
+    path('profile/<str:username>/', read.profile, name='profile'),
+    path('posts/<int:post_id>/', read.post_detail, name='post_detail'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/', read.post_comments,
+        name='post_comments'
+    ),
+    path('search/', read.post_search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
-    path('follow/', views.follow_index, name='follow_index'),
+    path('follow/', read.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,15 +1,36 @@
+from django.conf import settings
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404
 
-from .models import User
+from .models import Comment, User
+from .paginator import CursorPaginator
 
 
 def do_page_obj(request, q_set, num_of_items):
+    cursor = request.GET.get('cursor')
+    if cursor is not None or settings.FEED_PAGINATION == 'cursor':
+        return CursorPaginator(q_set, num_of_items).get_page(cursor)
     page_num = request.GET.get('page')
     paginator = Paginator(q_set, num_of_items)
     return paginator.get_page(page_num)
 
 
+def comments_page(post_id, cursor=None):
+    """Страница комментариев поста по ключу (created, id).
+
+    Загружаются только поля, которые показывает шаблон, а страница стоит
+    одинаково при любом числе комментариев.
+    """
+    comments = (
+        Comment.objects.filter(post_id=post_id)
+        .select_related('author')
+        .only('text', 'created', 'author', 'author__username')
+    )
+    return CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, ordering=('created', 'id')
+    ).get_page(cursor)
+
+
 def extract_user_author(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
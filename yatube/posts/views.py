@@ -1,15 +1,26 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
+
+from core.db import read_replica
 
+from . import search, timeline
+from .caching import cache_feed_page, post_etag, post_last_modified
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import do_page_obj, extract_user_author
+from .uploads import stream_image_uploads
+from .utils import comments_page, do_page_obj, extract_user_author
 
 
+@read_replica
+@cache_feed_page('feed:index')
 def index(request):
-    posts = Post.objects.select_related('author',
-                                        'group')
+    posts = Post.objects.for_feed()
     page_obj = do_page_obj(request, posts, settings.NUM_OF_POSTS)
     context = {
         'page_obj': page_obj,
@@ -17,9 +28,11 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@read_replica
+@cache_feed_page('feed:group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author', 'group')
+    posts = group.posts.for_feed()
     page_obj = do_page_obj(request, posts, settings.NUM_OF_POSTS)
     context = {
         'group': group,
@@ -28,9 +41,14 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_replica
+@cache_feed_page('feed:profile:{username}')
 def profile(request, username):
-    posts_owner = get_object_or_404(User, username=username)
-    posts = posts_owner.posts.select_related('author', 'group')
+    posts_owner = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username
+    )
+    posts = posts_owner.posts.for_feed()
     page_obj = do_page_obj(request, posts, settings.NUM_OF_POSTS)
     following = False
     if request.user.is_authenticated:
@@ -46,36 +64,68 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@read_replica
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
+        Post.objects.select_related('author__counters', 'group'),
         pk=post_id
     )
     form = CommentForm()
-    comments = post.comments.select_related('author', 'post')
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments_page(post.pk)
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@read_replica
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+def post_comments(request, post_id):
+    """Следующие страницы комментариев фрагментом для post_detail."""
+    context = {
+        'comments': comments_page(post_id, request.GET.get('cursor')),
+        'post_id': post_id,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    if search.available():
+        results = search.SearchResults(query)
+    else:
+        results = Post.objects.for_feed().filter(
+            text__icontains=query) if query else Post.objects.none()
+    paginator = Paginator(results, settings.NUM_OF_POSTS)
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'query': query,
+        'paginator_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@stream_image_uploads
 def post_create(request):
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None
+        files=request.FILES or None,
+        upload_errors=request.upload_errors
     )
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
     save_form = form.save(commit=False)
     save_form.author = request.user
-    save_form.save()
+    with transaction.atomic():
+        save_form.save()
     return redirect('posts:profile', request.user.username)
 
 
 @login_required
+@stream_image_uploads
 def post_edit(request, post_id):
     post_obj = get_object_or_404(Post, id=post_id)
     if request.user != post_obj.author:
@@ -83,7 +133,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         instance=post_obj,
-        files=request.FILES or None
+        files=request.FILES or None,
+        upload_errors=request.upload_errors
     )
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form,
@@ -100,16 +151,19 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id)
 
 
+@read_replica
 @login_required
 def follow_index(request):
-    follower = request.user
-    posts = Post.objects.filter(
-        author__following__user=follower).select_related('group', 'author')
-    page_obj = do_page_obj(request, posts, settings.NUM_OF_POSTS)
+    page_obj = timeline.feed_page(
+        request.user,
+        lambda rows, post_path: do_page_obj(
+            request, rows.for_feed(), settings.NUM_OF_POSTS)
+    )
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
@@ -117,13 +171,18 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     data = extract_user_author(request, username)
-    if not Follow.objects.filter(**data).exists():
-        Follow.objects.create(**data)
+    # Повторная подписка упирается в unique_follow и ничего не меняет.
+    try:
+        with transaction.atomic():
+            Follow.objects.create(**data)
+    except IntegrityError:
+        pass
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
     data = extract_user_author(request, username)
-    Follow.objects.filter(**data).delete()
+    with transaction.atomic():
+        Follow.objects.filter(**data).delete()
     return redirect('posts:profile', username)
@@ -4,20 +4,21 @@ Django settings for yatube project.
 Generated by 'django-admin startproject' using Django 2.2.19.
 
 For more information on this file, see
-https://docs.djangoproject.com/en/2.2/topics/settings/
+https://docs.djangoproject.com/en/3.2/topics/settings/
 
 For the full list of settings and their values, see
-https://docs.djangoproject.com/en/2.2/ref/settings/
+https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 # Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+# See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'rrtepl&^()&2cu@2k)ez26yz!vwnd@g%@id!%*72dnepvjt7@9'
@@ -46,10 +47,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail'
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.NPlusOneMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,7 +70,8 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, время отрисовки которых видно в core.metrics
+        'BACKEND': 'core.templating.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,18 +87,64 @@ TEMPLATES = [
 ]
 
 
+CACHE_BACKENDS = {
+    # общий для всех процессов кэш в файле, внешний сервер не нужен
+    'sqlite': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.getenv('YATUBE_CACHE_LOCATION',
+                              os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_BYTES': 128 * 1024 * 1024,
+            'STALE_TIMEOUT': 30,
+        },
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Файл кэша переживает перезапуски, и при разработке и под pytest в нём
+# находились бы страницы и карточки, собранные по другой базе: там кэш
+# по умолчанию в памяти процесса.
+CACHE = os.getenv('YATUBE_CACHE',
+                  'locmem' if DEBUG or 'pytest' in sys.modules else 'sqlite')
+# счётчики core.metrics: отдельно от общего кэша и без вытеснения,
+# иначе давление на LRU молча теряло бы их
+METRICS_CACHE_BACKENDS = {
+    'sqlite': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.getenv('YATUBE_METRICS_CACHE_LOCATION',
+                              os.path.join(BASE_DIR, 'metrics.sqlite3')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_BYTES': None},
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'metrics',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10 ** 9},
+    },
+}
+
 CACHES = {
+    # MeteredCache считает попадания и промахи в замер core.metrics,
+    # а хранит записи бэкенд из OPTIONS['BACKEND']
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        **CACHE_BACKENDS[CACHE],
+        'BACKEND': 'core.cache.MeteredCache',
+        'OPTIONS': {**CACHE_BACKENDS[CACHE].get('OPTIONS', {}),
+                    'BACKEND': CACHE_BACKENDS[CACHE]['BACKEND']},
+    },
+    'metrics': METRICS_CACHE_BACKENDS[CACHE],
 }
 
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
 
 
 # Database
-# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+# https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
 DATABASES = {
     'default': {
@@ -100,10 +152,29 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Таблицы созданы с 32-битными id, миграции менять не нужно.
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+# Реплики для чтения лент (core.db). Локально это копии db.sqlite3,
+# которые обновляет manage.py sync_replicas; в тестах — сама база.
+for number in range(1, int(os.getenv('YATUBE_REPLICAS', '0')) + 1):
+    DATABASES[f'replica_{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db_replica_{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+# сколько секунд после записи браузер читает с основной базы;
+# должно быть больше, чем отставание реплик
+REPLICA_STICKY_SECONDS = 30
+# yatube/asgi.py включает асинхронные страницы posts; код страниц идёт в
+# пул из ASYNC_DB_THREADS потоков (core.asyncdb), 0 — в общий поток Django
+ASYNC_VIEWS = os.getenv('YATUBE_ASGI') == '1'
+ASYNC_DB_THREADS = int(os.getenv('YATUBE_ASYNC_DB_THREADS', '8'))
 
 
 # Password validation
-# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+# https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -122,7 +193,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 # Internationalization
-# https://docs.djangoproject.com/en/2.2/topics/i18n/
+# https://docs.djangoproject.com/en/3.2/topics/i18n/
 
 LANGUAGE_CODE = 'ru'
 
@@ -136,7 +207,7 @@ USE_TZ = True
 
 
 # Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/2.2/howto/static-files/
+# https://docs.djangoproject.com/en/3.2/howto/static-files/
 
 STATIC_URL = '/static/'
 
@@ -148,12 +219,46 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# картинки постов проверяются по ходу загрузки, см. posts.uploads
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_SIDE = 8000
 
 # My variables
 
 NUM_OF_POSTS: int = 10
+# комментарии на post_detail грузятся страницами по ключу (created, id)
+COMMENTS_PER_PAGE = 20
+# наибольший ?limit= страницы в JSON API
+API_MAX_PAGE_SIZE = 100
+# наибольшая пачка постов или комментариев за один POST в API
+API_MAX_BATCH_SIZE = 500
+# 'page' — нумерованные страницы, 'cursor' — навигация по ключу без COUNT(*)
+FEED_PAGINATION = 'page'
+# авторы с большим числом подписчиков читаются из ленты при запросе
+TIMELINE_FANOUT_LIMIT = 1000
+# карточки ключуются версиями объектов, так что живут долго
+POST_CARD_TIMEOUT = 60 * 60 * 24
+# страницы лент для анонимов; при разработке кэш мешает видеть правки
+ANONYMOUS_PAGE_CACHE = not DEBUG
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 60
+# потоки нарезки миниатюр; 0 — нарезать сразу в запросе
+THUMBNAIL_WORKERS = 2
 DISP_LETTERS = 15
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+# доля запросов, которые замеряет core.middleware; остальные не трогаются
+PERF_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+# заголовок Server-Timing с замером для инструментов разработчика;
+# в проде он раскрыл бы любому посетителю время SQL и число запросов
+PERF_SERVER_TIMING = DEBUG
+# N+1: столько одинаковых запросов из одного места за запрос — ошибка;
+# под тестами (core.testrunner) она роняет тест, иначе пишется в лог
+NPLUSONE_THRESHOLD = 3
+NPLUSONE_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+NPLUSONE_RAISE = False
+TEST_RUNNER = 'core.testrunner.TestRunner'
+# токен для сводки /-/metrics/ без входа под staff: заголовок
+# Authorization: Bearer <токен>; пустой — только staff
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN', '')
 # LOGOUT_REDIRECT_URL = 'posts:index'